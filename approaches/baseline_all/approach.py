@@ -11,14 +11,30 @@ def approach():
     drop_months_end = int(args[4])
     num_test_commits = int(args[5])
 
+    # optionally, a comma-separated list of projects can be supplied to only run these projects
+    # this allows to run the projects in parallel, see run_all.py
+    project_names = list_all_projects(path=data_path)
+    if len(args)>6:
+        project_names = args[6].split(',')
+
     ######################################
     # Loop for within project prediction #
     # Loads only one project at a time   #
     ######################################
     
-    for project_name in list_all_projects(path=data_path):
+    for project_name in project_names:
         print(project_name)
-        data = load_project(path=data_path, project_name=project_name)
+
+        # we reuse the results of an earlier run, if neither the approach, nor the data, nor the parameters changed
+        params = {'drop_months_end': drop_months_end, 'num_test_commits': num_test_commits}
+        key = run_key(__file__, data_path, [project_name], **params)
+        run = load_run(score_path, key)
+        if run is not None:
+            replay_run(score_path, approach_name, project_name, run, params=params)
+            continue
+
+        # this baseline uses no features, hence we only load the data required for the labels and scores
+        data = load_project(path=data_path, project_name=project_name, columns=[])
 
         train_df, test_df = prepare_within_project_data(data, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
 
@@ -28,7 +44,7 @@ def approach():
         #########################################
 
         y_test = test_df['is_inducing']
-        y_pred = y_test.copy().values
+        y_pred = y_test.to_numpy(copy=True)
         y_pred.fill(1)   
 
         ######################################################
@@ -38,7 +54,8 @@ def approach():
 
         scores = score_model(test_df, y_pred)
         print_summary(train_df, test_df, scores)
-        write_scores(score_path, approach_name, project_name, scores)
+        write_scores(score_path, approach_name, project_name, scores, params=params)
+        store_run(score_path, key, train_df, test_df, y_pred, scores)
 
         
 if __name__ == '__main__':
@@ -1,10 +1,66 @@
 import sys
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
 
 from imblearn.over_sampling import SMOTE
 
 from utils import *
 
+# bytes of memory per row of a chunk of training data, i.e., the float32 features of the chunk, the chunk after
+# the resampling with SMOTE, which may almost double it, and a copy of the chunk within SMOTE
+BYTES_PER_ROW = 4*4*len(ALL_FEATURES)
+
+
+def fit_chunked_forest(data_path, train_df, features, chunks, estimator, n_estimators, random_state, rf=None):
+    """fits a random forest with SMOTE chunk by chunk, such that only the features of one chunk are in memory
+
+    the rows of each chunk (see training_chunks) are resampled with SMOTE and get a share of the n_estimators trees
+    that is proportional to their number. each chunk is fitted with a clone of the estimator and the trees of all
+    chunks are combined into one forest. if a fitted forest is supplied, the trees are added to it instead. chunks
+    with only one class are merged into the next chunk (or the previous one, for the last chunk), such that all
+    rows are used, and a ValueError is raised if the training data has only one class."""
+    labels = train_df['is_inducing'].to_numpy(dtype=bool)
+    merged = []
+    pending = np.array([], dtype=int)
+    for chunk in chunks:
+        chunk = np.union1d(pending, chunk)
+        if labels[chunk].all() or not labels[chunk].any():
+            pending = chunk
+        else:
+            merged.append(chunk)
+            pending = np.array([], dtype=int)
+    if len(merged)==0:
+        raise ValueError('cannot fit a random forest, the training data has only one class')
+    if len(pending)>0:
+        merged[-1] = np.union1d(merged[-1], pending)
+    chunks = merged
+
+    rng = np.random.RandomState(random_state)
+    sizes = np.array([len(chunk) for chunk in chunks])
+    trees = np.floor(n_estimators*sizes/sizes.sum()).astype(int)
+    trees[np.argsort(-(n_estimators*sizes/sizes.sum()-trees), kind='stable')[:n_estimators-trees.sum()]] += 1
+
+    for chunk, chunk_trees in zip(chunks, trees):
+        if chunk_trees==0:
+            continue
+        chunk_df = train_df.iloc[chunk]
+        y_chunk = labels[chunk]
+        X_chunk = load_features(data_path, chunk_df, features=features)
+        # SMOTE requires more rows of the minority class than neighbors, chunks with one such row are used as they are
+        minority = min(y_chunk.sum(), (~y_chunk).sum())
+        if minority>1:
+            X_chunk, y_chunk = SMOTE(k_neighbors=max(1, min(5, minority-1)), random_state=rng.randint(2**31)).fit_resample(X_chunk, y_chunk)
+        chunk_rf = clone(estimator).set_params(n_estimators=chunk_trees, random_state=rng.randint(2**31))
+        chunk_rf.fit(X_chunk, y_chunk)
+        del X_chunk
+        if rf is None:
+            rf = chunk_rf
+        else:
+            rf.estimators_ += chunk_rf.estimators_
+            rf.n_estimators = len(rf.estimators_)
+    return rf
+
+
 def approach():
     args = sys.argv
     
@@ -14,17 +70,49 @@ def approach():
     drop_months_end = int(args[4])
     num_test_commits = int(args[5])
 
-    #################################################################################
-    # Loop for using all data                                                       #
-    # Load requires at least 17 GB memory                                           #
-    # Required about 75 GB virtual memory total on my machine for the random forest #
-    #################################################################################
+    # we recommend using a fixed random seed for reproducibility, but this is up to you
+    RANDOM_SEED = 42
+
+    # by default, a stored random forest is only reused if it was trained with the same data, set UPDATE_MODELS to
+    # add TREES_PER_UPDATE trees to it when new training data is available instead, then the results depend on the
+    # earlier runs
+    UPDATE_MODELS = False
+    TREES_PER_UPDATE = 20
+
+    # optionally, a comma-separated list of projects can be supplied to only use these projects as test projects
+    # all projects are still used for training, this allows to run the projects in parallel, see run_all.py
+    test_project_names = None
+    if len(args)>6:
+        test_project_names = args[6].split(',')
+
+    # the training data is processed in chunks that fit into the memory budget, see memory_budget
+    # e.g., PROMISE_MEMORY_GB=8 python approach.py ... trains with at most 8 GB of training data in memory
+    max_chunk_rows = max(1, memory_budget()//BYTES_PER_ROW)
+
+    ######################################################################################
+    # Loop for using all data                                                            #
+    # Features are memory-mapped from the feature store, see load_features               #
+    # The random forest is trained in chunks to bound the memory, see fit_chunked_forest #
+    ######################################################################################
         
-    projects = load_all_projects(path=data_path)
+    # the features are read from the feature store below, hence we only load the data required for the labels and scores
+    projects = load_all_projects(path=data_path, columns=[])
+
+    if test_project_names is None:
+        test_project_names = list(projects)
 
-    for project in projects:
+    for project in test_project_names:
         print(project)
 
+        # we reuse the results of an earlier run, if neither the approach, nor the data, nor the parameters changed
+        params = {'drop_months_end': drop_months_end, 'num_test_commits': num_test_commits}
+        key = run_key(__file__, data_path, list(projects), test_project=project, random_seed=RANDOM_SEED,
+                      max_chunk_rows=max_chunk_rows, **params)
+        run = load_run(score_path, key)
+        if run is not None:
+            replay_run(score_path, approach_name, project, run, params=params)
+            continue
+
         train_df, test_df = prepare_all_data(project, projects, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
         
         #########################################
@@ -51,21 +139,39 @@ def approach():
         # https://github.com/smartshark/promise-challenge/blob/main/dataset.md
         # 
         # we use all available features for our baseline
-        X_train = train_df[ALL_FEATURES].values
-        X_test = test_df[ALL_FEATURES].values
+        # the features are read from the memory-mapped feature store of the projects (see load_features),
+        # e.g., load_features(data_path, train_df, features=JIT_FEATURES) would only use the JIT features
+        # and pruned_features(data_path, train_df) drops features that are constant or duplicates in the training data
+        features = ALL_FEATURES
+        # the training features are only loaded per chunk (see fit_chunked_forest) or per project
+        X_train = (load_features(data_path, project_df, features=features) for _, project_df in train_df.groupby('project', sort=False))
+        X_test = load_features(data_path, test_df, features=features)
 
         # binary labels are in the column 'is_inducing'
         y_train = train_df['is_inducing']
         y_test = test_df['is_inducing']
 
-        # we recommend using a fixed random seed for reproducibility, but this is up to you
-        RANDOM_SEED = 42
         np.random.seed(RANDOM_SEED)
 
-        # we train the RF without resampling with SMOTE due to memory constraints
-        rf = RandomForestClassifier()
-        rf.fit(X_train, y_train)
-        y_pred = rf.predict(X_test)
+        # we reuse the stored random forest, if it was trained with the same approach, features, and training data
+        # with UPDATE_MODELS, we add trees to the forest if only new training commits were added since
+        estimator = RandomForestClassifier(n_estimators=100)
+        model_name = '{}_{}'.format(approach_name, project)
+        info = model_info(train_df, X_train, features, estimator=estimator, approach_file=__file__, max_chunk_rows=max_chunk_rows)
+        rf, up_to_date = load_model(score_path, model_name, info, update=UPDATE_MODELS)
+        if not up_to_date:
+            # we resample each chunk with SMOTE and build a random forest from the trees of all chunks
+            # if all training data fits into one chunk, this is a single SMOTE resampling and random forest
+            # the stages are recorded if the environment variable PROMISE_PROFILE is set, see profile_stage
+            chunks = training_chunks(train_df, max_chunk_rows, random_state=RANDOM_SEED)
+            with profile_stage('fit'):
+                if rf is None:
+                    rf = fit_chunked_forest(data_path, train_df, features, chunks, estimator, estimator.n_estimators, RANDOM_SEED)
+                else:
+                    rf = fit_chunked_forest(data_path, train_df, features, chunks, estimator, TREES_PER_UPDATE, RANDOM_SEED+rf.n_estimators, rf=rf)
+            store_model(score_path, model_name, rf, info)
+        with profile_stage('predict'):
+            y_pred = rf.predict(X_test)
 
         ######################################################
         # DO NOT TOUCH FROM HERE                             #
@@ -74,7 +180,8 @@ def approach():
 
         scores = score_model(test_df, y_pred)
         print_summary(train_df, test_df, scores)
-        write_scores(score_path, approach_name, project, scores)
+        write_scores(score_path, approach_name, project, scores, params=params)
+        store_run(score_path, key, train_df, test_df, y_pred, scores)
 
         
 if __name__ == '__main__':
@@ -14,14 +14,39 @@ def approach():
     drop_months_end = int(args[4])
     num_test_commits = int(args[5])
 
+    # we recommend using a fixed random seed for reproducibility, but this is up to you
+    RANDOM_SEED = 42
+
+    # by default, a stored random forest is only reused if it was trained with the same data, set UPDATE_MODELS to
+    # add TREES_PER_UPDATE trees to it when new training data is available instead, then the results depend on the
+    # earlier runs
+    UPDATE_MODELS = False
+    TREES_PER_UPDATE = 20
+
+    # optionally, a comma-separated list of projects can be supplied to only run these projects
+    # this allows to run the projects in parallel, see run_all.py
+    project_names = list_all_projects(path=data_path)
+    if len(args)>6:
+        project_names = args[6].split(',')
+
     ######################################
     # Loop for within project prediction #
     # Loads only one project at a time   #
     ######################################
     
-    for project_name in list_all_projects(path=data_path):
+    for project_name in project_names:
         print(project_name)
-        data = load_project(path=data_path, project_name=project_name)
+
+        # we reuse the results of an earlier run, if neither the approach, nor the data, nor the parameters changed
+        params = {'drop_months_end': drop_months_end, 'num_test_commits': num_test_commits}
+        key = run_key(__file__, data_path, [project_name], random_seed=RANDOM_SEED, **params)
+        run = load_run(score_path, key)
+        if run is not None:
+            replay_run(score_path, approach_name, project_name, run, params=params)
+            continue
+
+        # the features are read from the feature store below, hence we only load the data required for the labels and scores
+        data = load_project(path=data_path, project_name=project_name, columns=[])
 
         train_df, test_df = prepare_within_project_data(data, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
 
@@ -49,22 +74,39 @@ def approach():
         # https://github.com/smartshark/promise-challenge/blob/main/dataset.md
         # 
         # we use all available features for our baseline
-        X_train = train_df[ALL_FEATURES].values
-        X_test = test_df[ALL_FEATURES].values
+        # the features are read from the memory-mapped feature store of the projects (see load_features),
+        # e.g., load_features(data_path, train_df, features=JIT_FEATURES) would only use the JIT features
+        # and pruned_features(data_path, train_df) drops features that are constant or duplicates in the training data
+        features = ALL_FEATURES
+        X_train = load_features(data_path, train_df, features=features)
+        X_test = load_features(data_path, test_df, features=features)
 
         # binary labels are in the column 'is_inducing'
         y_train = train_df['is_inducing']
         y_test = test_df['is_inducing']
 
-        # we recommend using a fixed random seed for reproducibility, but this is up to you
-        RANDOM_SEED = 42
         np.random.seed(RANDOM_SEED)
 
-        # we resample with SMOTE and build a random forest for our baseline
-        X_res, y_res = SMOTE(random_state=RANDOM_SEED).fit_resample(X_train, y_train)
-        rf = RandomForestClassifier()
-        rf.fit(X_res, y_res)
-        y_pred = rf.predict(X_test)
+        # we reuse the stored random forest, if it was trained with the same approach, features, and training data
+        # with UPDATE_MODELS, we add trees to the forest if only new training commits were added since
+        estimator = RandomForestClassifier()
+        model_name = '{}_{}'.format(approach_name, project_name)
+        info = model_info(train_df, X_train, features, estimator=estimator, approach_file=__file__)
+        rf, up_to_date = load_model(score_path, model_name, info, update=UPDATE_MODELS)
+        if not up_to_date:
+            # we resample with SMOTE and build a random forest for our baseline
+            # the stages are recorded if the environment variable PROMISE_PROFILE is set, see profile_stage
+            with profile_stage('resample'):
+                X_res, y_res = SMOTE(random_state=RANDOM_SEED).fit_resample(X_train, y_train)
+            if rf is None:
+                rf = estimator
+            else:
+                rf.set_params(warm_start=True, n_estimators=rf.n_estimators+TREES_PER_UPDATE)
+            with profile_stage('fit'):
+                rf.fit(X_res, y_res)
+            store_model(score_path, model_name, rf, info)
+        with profile_stage('predict'):
+            y_pred = rf.predict(X_test)
 
         ######################################################
         # DO NOT TOUCH FROM HERE                             #
@@ -73,7 +115,8 @@ def approach():
 
         scores = score_model(test_df, y_pred)
         print_summary(train_df, test_df, scores)
-        write_scores(score_path, approach_name, project_name, scores)
+        write_scores(score_path, approach_name, project_name, scores, params=params)
+        store_run(score_path, key, train_df, test_df, y_pred, scores)
 
         
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+"""Load generator for serve.py.
+
+Replays the commits of a project in the order of its csv file, i.e., each commit is one request with the feature
+rows of its files, and sends them with several concurrent clients. Reports the requests per second and the p50 and
+p99 latency. Example:
+
+    python load_generator.py ../../data samza --url http://localhost:8080 --clients 8
+    python load_generator.py ../../data samza --socket /tmp/predict.sock
+"""
+import argparse
+import http.client
+import json
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from utils import *
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http connection over a UNIX socket"""
+
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def connection(args):
+    """return a new connection to the server"""
+    if args.socket:
+        return UnixHTTPConnection(args.socket)
+    url = urlparse(args.url)
+    return http.client.HTTPConnection(url.hostname, url.port)
+
+
+def request(conn, method, path, body=None):
+    """sends a request and return the decoded response"""
+    conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    content = json.loads(response.read())
+    if response.status!=200:
+        raise RuntimeError('request failed with {}: {}'.format(response.status, content.get('error')))
+    return content
+
+
+def commit_requests(data_path, project_name, features, max_commits=None):
+    """return the body of one request per commit of the project, in the order of the csv file"""
+    store, rows = load_feature_store(data_path, project_name)
+    columns = [ALL_FEATURES.index(feature) for feature in features]
+    bodies = []
+    for _, positions in rows.groupby('commit', sort=False).indices.items():
+        bodies.append(json.dumps({'rows': store[np.sort(positions)][:, columns].tolist()}).encode())
+        if max_commits and len(bodies)>=max_commits:
+            break
+    return bodies
+
+
+def client(args, bodies, latencies):
+    """sends the requests of a client over one connection and records their latency"""
+    conn = connection(args)
+    for body in bodies:
+        start = time.perf_counter()
+        request(conn, 'POST', '/predict', body)
+        latencies.append(time.perf_counter()-start)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='replays the commits of a project against serve.py')
+    parser.add_argument('data_path')
+    parser.add_argument('project_name')
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--socket', default=None, help='UNIX socket of the server instead of the url')
+    parser.add_argument('--clients', type=int, default=8, help='number of concurrent clients')
+    parser.add_argument('--commits', type=int, default=None, help='only replay the first commits')
+    args = parser.parse_args()
+
+    features = request(connection(args), 'GET', '/features')['features']
+    bodies = commit_requests(args.data_path, args.project_name, features, args.commits)
+
+    latencies = []
+    threads = [threading.Thread(target=client, args=(args, bodies[i::args.clients], latencies)) for i in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    runtime = time.perf_counter()-start
+
+    latencies = np.array(latencies)*1000
+    print('{} requests with {} clients in {:.1f}s: {:.1f} requests/s, p50 {:.1f}ms, p99 {:.1f}ms'.format(
+        len(latencies), args.clients, runtime, len(latencies)/runtime, np.percentile(latencies, 50), np.percentile(latencies, 99)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Prediction server for the baseline within project.
+
+The server loads a trained model and its feature list once and then scores commits as they arrive. A commit is
+sent as JSON with one feature row per file, either as lists in the order of the features of the model or as
+objects with the names of the features:
+
+    POST /predict {"rows": [[0.0, 1.0, ...], ...]}  ->  {"probabilities": [0.12, ...]}
+    GET /features                                  ->  {"features": ["current_McCC_file", ...]}
+
+Concurrent requests are micro-batched, i.e., the rows of all requests that arrive within --max-wait-ms are
+predicted together with a single call of predict_proba. The server listens on a TCP port or, with --socket, on a
+UNIX socket. The model file can be a model stored by approach.py in <scores>/models (see store_model in utils.py).
+If the model file does not exist, --train saves the model of approach.py for a project to it, the model stored in
+<scores>/models by approach.py is reused and otherwise trained and stored there first. Example:
+
+    python serve.py model.joblib --train samza --data ../../data --scores ../../scores --port 8080
+    python load_generator.py ../../data samza --url http://localhost:8080
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+
+from imblearn.over_sampling import SMOTE
+
+from utils import *
+
+RANDOM_SEED = 42
+APPROACH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'approach.py')
+
+
+def train_model(data_path, score_path, approach_name, project_name, drop_months_end=3, num_test_commits=250):
+    """return the model of approach.py for a project, it is trained and stored like in approach.py if it is not stored yet"""
+    data = load_project(path=data_path, project_name=project_name, columns=[])
+    train_df, _ = prepare_within_project_data(data, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
+    X_train = load_features(data_path, train_df, features=ALL_FEATURES)
+    np.random.seed(RANDOM_SEED)
+
+    # the same name and info as in approach.py, such that the model stored by a run of approach.py is reused
+    estimator = RandomForestClassifier()
+    model_name = '{}_{}'.format(approach_name, project_name)
+    info = model_info(train_df, X_train, ALL_FEATURES, estimator=estimator, approach_file=APPROACH_FILE)
+    rf, up_to_date = load_model(score_path, model_name, info)
+    if not up_to_date:
+        X_res, y_res = SMOTE(random_state=RANDOM_SEED).fit_resample(X_train, train_df['is_inducing'])
+        rf = estimator
+        rf.fit(X_res, y_res)
+        store_model(score_path, model_name, rf, info)
+    return rf, info
+
+
+class MicroBatcher:
+    """collects the rows of concurrent requests and predicts them together in a background thread"""
+
+    def __init__(self, model, max_batch_rows=4096, max_wait=0.002):
+        self.model = model
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.positive = list(model.classes_).index(True)
+        self.requests = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def predict(self, X):
+        """return the probabilities that the rows of X are inducing, blocks until the batch of X is predicted"""
+        request = {'X': X, 'done': threading.Event()}
+        self.requests.put(request)
+        request['done'].wait()
+        if 'error' in request:
+            raise request['error']
+        return request['probabilities']
+
+    def _next_batch(self):
+        """waits for the first request and then collects requests until the batch is full or max_wait passed"""
+        batch = [self.requests.get()]
+        rows = len(batch[0]['X'])
+        deadline = time.monotonic()+self.max_wait
+        while rows<self.max_batch_rows:
+            timeout = deadline-time.monotonic()
+            if timeout<=0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+            rows += len(batch[-1]['X'])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                probabilities = self.model.predict_proba(np.concatenate([request['X'] for request in batch]))[:, self.positive]
+                ends = np.cumsum([len(request['X']) for request in batch])
+                for request, request_probabilities in zip(batch, np.split(probabilities, ends[:-1])):
+                    request['probabilities'] = request_probabilities
+            except Exception as e:
+                for request in batch:
+                    request['error'] = e
+            for request in batch:
+                request['done'].set()
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """handles the requests, the server has the features and the batcher"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path!='/features':
+            return self._send(404, {'error': 'unknown path {}'.format(self.path)})
+        self._send(200, {'features': self.server.features})
+
+    def do_POST(self):
+        if self.path!='/predict':
+            return self._send(404, {'error': 'unknown path {}'.format(self.path)})
+        try:
+            rows = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['rows']
+            X = self._feature_matrix(rows)
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send(400, {'error': 'invalid request: {}'.format(e)})
+        self._send(200, {'probabilities': self.server.batcher.predict(X).tolist()})
+
+    def _feature_matrix(self, rows):
+        """return the rows as matrix with the features of the model as columns"""
+        features = self.server.features
+        if rows and isinstance(rows[0], dict):
+            rows = [[row[feature] for feature in features] for row in rows]
+        X = np.array(rows, dtype=np.float32).reshape(len(rows), -1)
+        if X.shape[1]!=len(features):
+            raise ValueError('expected {} features, got {}'.format(len(features), X.shape[1]))
+        return X
+
+    def _send(self, status, content):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    """http server on a UNIX socket"""
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        self.socket.bind(self.server_address)
+        self.server_name = self.server_address
+        self.server_port = 0
+
+    def get_request(self):
+        request, _ = self.socket.accept()
+        return request, ('unix', 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='serves the predictions of a trained model')
+    parser.add_argument('model', help='model file with the model and its features, see joblib.dump')
+    parser.add_argument('--train', metavar='PROJECT', default=None, help='trains and saves the model for a project, if the model file does not exist')
+    parser.add_argument('--data', default='../../data', help='folder with the data, only used with --train')
+    parser.add_argument('--scores', default='../../scores', help='folder with the models stored by approach.py, only used with --train')
+    parser.add_argument('--approach-name', default='baseline_rf_wp', help='name of the approach in the scores folder, only used with --train')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--socket', default=None, help='UNIX socket to listen on instead of the port')
+    parser.add_argument('--max-batch-rows', type=int, default=4096, help='maximal number of rows predicted together')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='maximal time a request waits for other requests')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        if args.train is None:
+            parser.error('model file {} does not exist, use --train to create it'.format(args.model))
+        model, info = train_model(args.data, args.scores, args.approach_name, args.train)
+        joblib.dump(dict(info, model=model), args.model)
+    saved = joblib.load(args.model)
+
+    if args.socket:
+        server = UnixHTTPServer(args.socket, PredictionHandler)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), PredictionHandler)
+    server.daemon_threads = True
+    server.features = saved['features']
+    server.batcher = MicroBatcher(saved['model'], max_batch_rows=args.max_batch_rows, max_wait=args.max_wait_ms/1000)
+    print('serving {} with {} features on {}'.format(args.model, len(server.features), args.socket or '{}:{}'.format(args.host, args.port)), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
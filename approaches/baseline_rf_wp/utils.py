@@ -1,14 +1,309 @@
+import contextlib
+import cProfile
 import csv
+import fcntl
+import functools
+import gzip
+import hashlib
+import inspect
+import json
 import os
+import pickle
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+import warnings
 from dateutil.relativedelta import relativedelta
 
+import joblib
 import pandas as pd
 import numpy as np
-from sklearn.metrics import matthews_corrcoef
+import scipy.sparse
+
+
+# folder within the data folder for the typed cache of the projects, see convert_project
+CACHE_FOLDER = '.cache'
+CACHE_VERSION = 6
+
+# version of the cached splits, see _cached_split
+# the source of the functions that compute the splits is also part of the key of a split
+SPLIT_VERSION = 1
+
+# id of the runs of approaches for the result store, see write_scores
+RUN_ID = os.environ.get('PROMISE_RUN_ID') or uuid.uuid4().hex
+
+# number of rows of the csv files that are parsed at once, see _csv_chunks
+CSV_CHUNK_ROWS = 1000
+
+# columns that are always loaded, regardless of the requested columns
+# the bug matrix (induces__*) is also always loaded
+METADATA_COLUMNS = ['commit', 'committer_date', 'la', 'ld']
+
+# name of the index of the data frames of the projects, the index is the row of the bug matrix, see bug_matrix
+ROW_INDEX = 'row'
+
+# per-stage profiling of the approaches, see profile_stage
+# PROMISE_PROFILE=1 records the stages, cprofile and tracemalloc (e.g., PROMISE_PROFILE=cprofile,tracemalloc) add
+# a cProfile of each stage and the peak of the memory allocated by python and numpy
+PROFILE = set(option.strip() for option in os.environ.get('PROMISE_PROFILE', '').split(',') if option.strip())
+_profile = {'depth': 0, 'records': []}
+
+# seconds between two samples of the RSS during a profiled stage
+PROFILE_RSS_INTERVAL = 0.01
+
+
+def _rss_mb():
+    """return the current RSS of the process in MB, or the peak RSS if the current RSS is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/1024**2
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+
+
+@contextlib.contextmanager
+def profile_stage(stage):
+    """records the wall time, cpu time, and RSS of a stage of an approach if the environment variable PROMISE_PROFILE
+    is set, e.g., with profile_stage('fit'): rf.fit(X_train, y_train)
+
+    the loading, preparation, and scoring functions of utils are recorded as stages, nested stages are only recorded
+    as part of the outer stage. the records are written with the scores of the next project, see write_scores."""
+    if not PROFILE or _profile['depth']>0:
+        yield
+        return
+    _profile['depth'] += 1
+    profiler = cProfile.Profile() if 'cprofile' in PROFILE else None
+    if 'tracemalloc' in PROFILE:
+        tracemalloc.start()
+    rss_before = _rss_mb()
+    # the peak RSS of the stage is sampled in the background, ru_maxrss would be the peak of the whole process
+    rss_peak = [rss_before]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(PROFILE_RSS_INTERVAL):
+            rss_peak[0] = max(rss_peak[0], _rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall, cpu = time.perf_counter()-start_wall, time.process_time()-start_cpu
+        done.set()
+        sampler.join()
+        rss = _rss_mb()
+        record = {'stage': stage,
+                  'wall': wall,
+                  'cpu': cpu,
+                  'rss_mb': rss,
+                  'rss_increase_mb': max(0.0, rss-rss_before),
+                  'rss_peak_mb': max(rss_peak[0], rss)}
+        if 'tracemalloc' in PROFILE:
+            record['alloc_peak_mb'] = tracemalloc.get_traced_memory()[1]/1024**2
+            tracemalloc.stop()
+        record['profiler'] = profiler
+        _profile['records'].append(record)
+        _profile['depth'] -= 1
+
+
+def _write_profile(path, approach_name, project):
+    """appends the recorded stages to <path>/<approach_name>_profile.csv, with the cProfiles in <path>/profiles
+
+    all stages since the last write are attributed to the project, e.g., also load_all_projects before the first
+    project. the file is locked, such that approaches that run in parallel can append to the same file."""
+    records, _profile['records'] = _profile['records'], []
+    if not records:
+        return
+    rows = []
+    for i, record in enumerate(records):
+        profiler = record.pop('profiler')
+        if profiler is not None:
+            profile_file = os.path.join(path, 'profiles', '{}_{}_{}_{}_{}.prof'.format(approach_name, project, RUN_ID, i, record['stage']))
+            os.makedirs(os.path.dirname(profile_file), exist_ok=True)
+            profiler.dump_stats(profile_file)
+        rows.append(dict({'project': project, 'run_id': RUN_ID}, **record))
+
+    fieldnames = ['project', 'run_id', 'stage', 'wall', 'cpu', 'rss_mb', 'rss_increase_mb', 'rss_peak_mb', 'alloc_peak_mb']
+    with open(os.path.join(path, approach_name+'_profile.csv'), 'a', newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if f.tell()==0:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+class BugMatrix:
+    """sparse file x bug matrix of a project, the rows follow the index of load_project, the columns the bugs"""
+
+    def __init__(self, matrix, bugs, row_fix_dates=None, offsets=None):
+        self.offsets = offsets
+        # rows of the matrix x bugs, i.e., the original induces__<issue>__<fixcommit>__<date> columns
+        self.matrix = scipy.sparse.csr_matrix(matrix, dtype=bool)
+        self.matrix.eliminate_zeros()
+        self.bugs = bugs.reset_index(drop=True)
+        # the sorted fix dates find the bugs fixed after a cutoff date with a single searchsorted
+        fix_dates = _utc_datetime64(self.bugs['fix_date'])
+        self._fix_order = np.argsort(fix_dates, kind='stable')
+        self._sorted_fix_dates = fix_dates[self._fix_order]
+        if row_fix_dates is None or len(row_fix_dates)!=self.matrix.nnz:
+            row_fix_dates = self._row_fix_dates(fix_dates)
+        # the sorted fix dates of the bugs of each row, row_fix_dates[indptr[i]:indptr[i+1]] belong to row i
+        self.row_fix_dates = np.asarray(row_fix_dates, dtype='datetime64[ns]')
+
+        # a row is inducing at a cutoff date if earliest_fix<=cutoff_date, NaT for rows without bugs
+        indptr = self.matrix.indptr
+        has_bugs = np.diff(indptr)>0
+        self.earliest_fix = np.full(self.matrix.shape[0], np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.latest_fix = self.earliest_fix.copy()
+        self.earliest_fix[has_bugs] = self.row_fix_dates[indptr[:-1][has_bugs]]
+        self.latest_fix[has_bugs] = self.row_fix_dates[indptr[1:][has_bugs]-1]
+
+    def _row_fix_dates(self, fix_dates):
+        """return the fix dates of the bugs of each row, sorted within each row, aligned with the indptr of the matrix"""
+        rows = np.repeat(np.arange(self.matrix.shape[0]), np.diff(self.matrix.indptr))
+        dates = fix_dates[self.matrix.indices]
+        return dates[np.lexsort((dates, rows))]
+
+    @classmethod
+    def from_columns(cls, matrix, names, fix_dates=None, row_fix_dates=None):
+        """create the bug matrix from the names of the induces__ columns, the fix dates are parsed unless supplied"""
+        names = list(names)
+        parts = [name.split('__') for name in names]
+        if fix_dates is None:
+            fix_dates = pd.to_datetime([p[3] for p in parts], utc=True)
+        else:
+            fix_dates = pd.to_datetime(fix_dates, utc=True)
+        bugs = pd.DataFrame({'name': names,
+                             'issue_id': [p[1] for p in parts],
+                             'fix_commit': [p[2] for p in parts],
+                             'fix_date': fix_dates})
+        return cls(matrix, bugs, row_fix_dates=row_fix_dates)
+
+    def inducing(self, rows=None, cutoff_dates=None):
+        """return for the rows (all by default) if they induce a bug fixed until the cutoff date(s), one column per date"""
+        earliest = self.earliest_fix if rows is None else self.earliest_fix[rows]
+        if cutoff_dates is None:
+            return ~np.isnat(earliest)
+        if np.ndim(cutoff_dates)==0:
+            return earliest<=_utc_datetime64(cutoff_dates)
+        cutoff_dates = np.array([_utc_datetime64(date) for date in cutoff_dates], dtype='datetime64[ns]')
+        return earliest[:, np.newaxis]<=cutoff_dates[np.newaxis, :]
+
+    def fixed_until(self, rows=None, cutoff_date=None):
+        """return for the rows (all by default) the number of their bugs that were fixed until the cutoff date"""
+        fixed = np.concatenate([[0], np.cumsum(self.row_fix_dates<=_utc_datetime64(cutoff_date))])
+        counts = fixed[self.matrix.indptr[1:]]-fixed[self.matrix.indptr[:-1]]
+        return counts if rows is None else counts[rows]
+
+    def until(self, cutoff_date):
+        """return the bug matrix with only the bugs that were fixed until the cutoff date, same as drop of later_than"""
+        start = np.searchsorted(self._sorted_fix_dates, _utc_datetime64(cutoff_date), side='right')
+        if start==len(self._sorted_fix_dates):
+            return self
+        keep = np.sort(self._fix_order[:start])
+        row_fix_dates = self.row_fix_dates[self.row_fix_dates<=_utc_datetime64(cutoff_date)]
+        return BugMatrix(self.matrix[:, keep], self.bugs.iloc[keep], row_fix_dates=row_fix_dates, offsets=self.offsets)
+
+    def later_than(self, cutoff_date):
+        """return the positions of the bugs that were fixed after the cutoff date in column order"""
+        start = np.searchsorted(self._sorted_fix_dates, _utc_datetime64(cutoff_date), side='right')
+        return np.sort(self._fix_order[start:])
+
+    def drop(self, names):
+        """return the bug matrix without the supplied bugs"""
+        keep = ~self.bugs['name'].isin(names).to_numpy()
+        return BugMatrix(self.matrix[:, np.flatnonzero(keep)], self.bugs[keep], offsets=self.offsets)
+
+    @classmethod
+    def combine(cls, bug_matrices):
+        """combine the bug matrices of projects (dict project -> BugMatrix), the rows of a project start at offsets"""
+        sizes = [bugs.matrix.shape[0] for bugs in bug_matrices.values()]
+        offsets = dict(zip(bug_matrices, np.concatenate([[0], np.cumsum(sizes)[:-1]]).tolist()))
+        return cls(scipy.sparse.block_diag([bugs.matrix for bugs in bug_matrices.values()], format='csr'),
+                   pd.concat([bugs.bugs for bugs in bug_matrices.values()], ignore_index=True),
+                   row_fix_dates=np.concatenate([bugs.row_fix_dates for bugs in bug_matrices.values()]),
+                   offsets=offsets)
+
+    def __copy__(self):
+        # the bug matrix is never modified, hence all data frames of a project can share it
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _utc_datetime64(dates):
+    """convert a date or series of dates to datetime64 in UTC"""
+    if isinstance(dates, pd.Series):
+        return dates.dt.tz_convert(None).to_numpy(dtype='datetime64[ns]')
+    date = pd.Timestamp(dates)
+    if date.tzinfo is not None:
+        date = date.tz_convert(None)
+    return date.to_datetime64().astype('datetime64[ns]')
+
+
+def _project_bugs(df):
+    """return the BugMatrix of a data frame"""
+    if 'bug_matrix' not in df.attrs:
+        raise ValueError('the data frame has no bug matrix, please use load_project to load the data')
+    return df.attrs['bug_matrix']
+
+
+def _bug_rows(df):
+    """return the BugMatrix of a data frame and the rows of the matrix, which are the index of the data frame"""
+    bugs = _project_bugs(df)
+    rows = df.index.to_numpy()
+    if bugs.offsets is not None:
+        # the bug matrix of several projects, see BugMatrix.combine
+        if 'project' not in df or not df['project'].isin(list(bugs.offsets)).all():
+            raise ValueError('the projects of the data frame do not match its bug matrix')
+        rows = rows+df['project'].map(bugs.offsets).to_numpy(dtype=np.int64)
+    if df.index.name!=ROW_INDEX or (len(rows)>0 and (rows.min()<0 or rows.max()>=bugs.matrix.shape[0])):
+        raise ValueError('the index of the data frame does not match its bug matrix, e.g., because of reset_index')
+    return bugs, rows
+
+
+def bug_matrix(df):
+    """return the sparse bug matrix for the rows of a data frame and the table of bugs (see BugMatrix)"""
+    bugs, rows = _bug_rows(df)
+    return bugs.matrix[rows], bugs.bugs
+
+
+def drop_bugs(df, names):
+    """drop bugs, i.e., columns of the bug matrix (see bug_columns), from a data frame"""
+    df.attrs = dict(df.attrs, bug_matrix=_project_bugs(df).drop(names))
+
+
+def drop_bugs_later_than(df, cutoff_date):
+    """drop the bugs that were fixed after the cutoff date from a data frame, same as drop_bugs with bugs_later_than"""
+    if not cutoff_date:
+        raise Exception('please supply a cutoff date')
+    df.attrs = dict(df.attrs, bug_matrix=_project_bugs(df).until(cutoff_date))
+
+
+def inducing(df, cutoff_dates=None):
+    """return for each row of a data frame if it induces a bug of its bug matrix, optionally only bugs that
+    were fixed until the cutoff date, or a bool matrix with one column per cutoff date (see BugMatrix.inducing)"""
+    bugs, rows = _bug_rows(df)
+    return bugs.inducing(rows, cutoff_dates)
 
 
 def bug_columns(df, label='induces'):
     """return all columns from the bug-matrix"""
+    if label=='induces' and 'bug_matrix' in df.attrs:
+        return df.attrs['bug_matrix'].bugs['name'].tolist()
     jlip = []
     for col in df.columns:
         if col.startswith('{}__'.format(label)):
@@ -16,21 +311,447 @@ def bug_columns(df, label='induces'):
     return jlip
 
 
-def load_project(path, project_name):
-    """load project from the supplied csv"""
+@profile_stage('load')
+def load_project(path, project_name, columns=None, use_cache=True, cache_path=None, dtype=np.float32):
+    """load project from the supplied csv, optionally only the supplied columns (e.g., columns=JIT_FEATURES)"""
+    # the METADATA_COLUMNS and the bug matrix are always loaded, they are required for the labels and scores
+    if columns is not None:
+        columns = _projected_columns(columns)
+    # the cache (see convert_project) stores float32, the exact values of the csv require use_cache=False and
+    # dtype=np.float64 (see validate_float32)
+    if use_cache:
+        df = _load_cached_project(path, project_name, columns=columns, cache_path=cache_path, dtype=dtype)
+    else:
+        df = _read_project_csv(_project_file(path, project_name), columns=columns, dtype=dtype)
+    df['project'] = project_name
+    df.index.name = ROW_INDEX
+    return df
+
+
+def _projected_columns(columns):
+    """return the requested columns together with the METADATA_COLUMNS without duplicates"""
+    projected = []
+    for col in METADATA_COLUMNS+list(columns):
+        if col not in projected:
+            projected.append(col)
+    return projected
+
+
+def _project_file(path, project_name):
+    """return the csv file of a project"""
     if not path.endswith('/') and len(path)>0:
         path += '/'
-    df =  pd.read_csv(path+project_name+'.csv.gz')
-    df['project'] = project_name
-    df['committer_date'] = pd.to_datetime(df['committer_date'])
+    return path+project_name+'.csv.gz'
+
+
+def _read_project_csv(file_name, columns=None, dtype=np.float32):
+    """parse the csv of a project, optionally only the supplied columns, and replace its bug matrix with a BugMatrix"""
+    # the bug matrix of each chunk is sparse right away, the peak memory is about twice the typed data frame
+    frames = []
+    induces = []
+    for chunk in _csv_chunks(file_name, columns=columns, dtype=dtype):
+        induces_cols = bug_columns(chunk)
+        induces.append(scipy.sparse.csr_matrix(chunk[induces_cols].to_numpy(dtype=bool)))
+        frames.append(chunk.drop(columns=induces_cols))
+    df = pd.concat(frames, ignore_index=True)
+    df.attrs['bug_matrix'] = BugMatrix.from_columns(scipy.sparse.vstack(induces), induces_cols)
+    return df
+
+
+def _csv_chunks(file_name, columns=None, dtype=np.float32, chunk_rows=CSV_CHUNK_ROWS):
+    """parse the csv of a project in chunks of rows with the dtypes of the SCHEMA, optionally only the supplied columns"""
+    header = list(pd.read_csv(file_name, nrows=0).columns)
+    if columns is not None:
+        wanted = set(columns)
+        if wanted.difference(header):
+            raise ValueError('unknown columns: {}'.format(sorted(wanted.difference(header))))
+        header = [col for col in header if col in wanted or (SCHEMA.declared(col) and SCHEMA.kind(col)=='induces')]
+    # columns that are not part of the schema, e.g., features of other versions of the data, are skipped
+    undeclared = [col for col in header if not SCHEMA.declared(col)]
+    if undeclared:
+        warnings.warn('{} has columns that are not part of the schema, they are skipped: {}'.format(file_name, ', '.join(undeclared)))
+        header = [col for col in header if col not in undeclared]
+    dtypes = SCHEMA.csv_dtypes(header, dtype=dtype)
+    int_cols = set(col for col in header if SCHEMA.column(col).dtype==np.int32)
+    with pd.read_csv(file_name, usecols=header, chunksize=chunk_rows, dtype=dtypes) as reader:
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                return
+            except (TypeError, ValueError) as e:
+                raise ValueError('{} does not match the schema: {}'.format(file_name, e))
+            if 'committer_date' in chunk:
+                chunk['committer_date'] = pd.to_datetime(chunk['committer_date'], utc=True).astype(SCHEMA.column('committer_date').dtype)
+            # a malformed value fails the parsing instead of changing the types
+            SCHEMA.validate(chunk, name=file_name)
+            # the frame is built again from the columns, which also consolidates the columns of the same dtype
+            yield pd.DataFrame({col: chunk[col].astype(dtype) if col in int_cols else chunk[col] for col in chunk.columns})
+
+
+def _count_rows(file_name):
+    """return the number of rows of a csv file without parsing it, i.e., the lines without the header"""
+    lines = 0
+    last = b'\n'
+    with gzip.open(file_name, 'rb') if file_name.endswith('.gz') else open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 24), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    # the last line may not end with a line break
+    if last!=b'\n':
+        lines += 1
+    return lines-1
+
+
+# checksums of the files that were hashed by this process, keyed by the file, its size, and its modification time
+_CHECKSUMS = {}
+
+
+def _file_checksum(file_name):
+    """return the sha1 checksum of a file, which is only computed again if the size or modification time changed"""
+    stat = os.stat(file_name)
+    key = (os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns)
+    if key not in _CHECKSUMS:
+        sha1 = hashlib.sha1()
+        with open(file_name, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        _CHECKSUMS[key] = sha1.hexdigest()
+    return _CHECKSUMS[key]
+
+
+def _cache_folder(path, project_name, cache_path=None):
+    """return the folder of the cache of a project, by default .cache within the data folder"""
+    if cache_path is None:
+        cache_path = os.path.join(path, CACHE_FOLDER)
+    return os.path.join(cache_path, project_name)
+
+
+def convert_project(path, project_name, cache_path=None):
+    """converts the csv of a project into a typed, column-oriented cache folder with one .npy file per block of columns"""
+    source = _project_file(path, project_name)
+    checksum = _file_checksum(source)
+    rows = _count_rows(source)
+
+    # we write into a temporary folder and rename it to the cache folder at the end
+    cache_folder = _cache_folder(path, project_name, cache_path)
+    os.makedirs(os.path.dirname(cache_folder), exist_ok=True)
+    tmp_folder = tempfile.mkdtemp(prefix=project_name+'.', dir=os.path.dirname(cache_folder))
+    old_folder = tmp_folder+'.old'
+    try:
+        meta = None
+        start = 0
+        # the chunks of rows are written into the memory-mapped features.npy and booleans.npy (column-major), only
+        # the sparse bug matrix, the dates, and the strings are collected in memory
+        for chunk in _csv_chunks(source):
+            if meta is None:
+                kinds = {col: SCHEMA.kind(col) for col in chunk.columns}
+                induces_cols = [col for col in chunk.columns if kinds[col]=='induces']
+                string_cols = [col for col in chunk.columns if kinds[col]=='string']
+                category_cols = [col for col in chunk.columns if kinds[col]=='category']
+                bool_cols = [col for col in chunk.columns if kinds[col]=='boolean']
+                feature_cols = [col for col in chunk.columns if kinds[col]=='feature']
+                meta = {'version': CACHE_VERSION,
+                        'checksum': checksum,
+                        'rows': rows,
+                        'columns': list(chunk.columns),
+                        'strings': string_cols,
+                        'categories': category_cols,
+                        'features': feature_cols,
+                        'booleans': bool_cols,
+                        'induces': induces_cols}
+                features = np.lib.format.open_memmap(os.path.join(tmp_folder, 'features.npy'), mode='w+', dtype=np.float32,
+                                                     shape=(rows, len(feature_cols)), fortran_order=True)
+                booleans = np.lib.format.open_memmap(os.path.join(tmp_folder, 'booleans.npy'), mode='w+', dtype=bool,
+                                                     shape=(rows, len(bool_cols)), fortran_order=True)
+                committer_date = np.empty(rows, dtype='datetime64[ns]')
+                strings = {col: [] for col in string_cols}
+                categories = {col: [] for col in category_cols}
+                induces = []
+
+            stop = start+len(chunk)
+            if stop>rows:
+                raise ValueError('{} has more rows than lines, e.g., because of line breaks within values'.format(source))
+            features[start:stop] = chunk[feature_cols].to_numpy(dtype=np.float32)
+            booleans[start:stop] = chunk[bool_cols].to_numpy(dtype=bool)
+            committer_date[start:stop] = chunk['committer_date'].dt.tz_convert(None).to_numpy(dtype='datetime64[ns]')
+            for col in string_cols:
+                strings[col].append(chunk[col].fillna('').to_numpy(dtype=str))
+            for col in category_cols:
+                categories[col].append(chunk[col].cat.codes.to_numpy(dtype=np.int8))
+            induces.append(scipy.sparse.csr_matrix(chunk[induces_cols].to_numpy(dtype=bool)))
+            start = stop
+        if meta is None or start!=rows:
+            raise ValueError('{} has {} rows, but {} lines'.format(source, start, rows))
+        features.flush()
+        booleans.flush()
+        del features, booleans
+
+        bugs = BugMatrix.from_columns(scipy.sparse.vstack(induces), induces_cols)
+        scipy.sparse.save_npz(os.path.join(tmp_folder, 'induces.npz'), bugs.matrix)
+        np.save(os.path.join(tmp_folder, 'bug_fix_date.npy'), _utc_datetime64(bugs.bugs['fix_date']))
+        np.save(os.path.join(tmp_folder, 'row_fix_dates.npy'), bugs.row_fix_dates)
+        np.save(os.path.join(tmp_folder, 'committer_date.npy'), committer_date)
+        for col in string_cols:
+            np.save(os.path.join(tmp_folder, col+'.npy'), np.concatenate(strings[col]))
+        for col in category_cols:
+            np.save(os.path.join(tmp_folder, col+'.npy'), np.concatenate(categories[col]))
+        with open(os.path.join(tmp_folder, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        # the old cache is moved aside before it is deleted, such that processes that read it keep their files
+        if os.path.exists(cache_folder):
+            os.rename(cache_folder, old_folder)
+        os.rename(tmp_folder, cache_folder)
+    except OSError:
+        # another process may have finished the cache of the same csv first
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        if (_read_cache_meta(cache_folder) or {}).get('checksum')!=checksum:
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        raise
+    finally:
+        shutil.rmtree(old_folder, ignore_errors=True)
+    return cache_folder
+
+
+def convert_all_projects(path, cache_path=None):
+    """converts all projects from a folder into the cache"""
+    for project_name in list_all_projects(path):
+        convert_project(path, project_name, cache_path=cache_path)
+
+
+def _read_cache_meta(cache_folder):
+    """return the meta data of a cache or None if there is no valid cache"""
+    try:
+        with open(os.path.join(cache_folder, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version')!=CACHE_VERSION:
+        return None
+    return meta
+
+
+def _up_to_date_cache(path, project_name, cache_path=None):
+    """return the folder and meta data of the cache of a project, the cache is (re)built if it is missing or outdated"""
+    cache_folder = _cache_folder(path, project_name, cache_path)
+    checksum = _file_checksum(_project_file(path, project_name))
+    meta = _read_cache_meta(cache_folder)
+    if meta is None or meta['checksum']!=checksum:
+        convert_project(path, project_name, cache_path=cache_path)
+        meta = _read_cache_meta(cache_folder)
+    return cache_folder, meta
+
+
+def _load_cached_project(path, project_name, columns=None, cache_path=None, dtype=np.float32):
+    """load a project from the cache, the cache is (re)built if it is missing or outdated
+
+    only the supplied columns and the bug matrix are read if columns are given"""
+    try:
+        cache_folder, meta = _up_to_date_cache(path, project_name, cache_path)
+    except (OSError, ValueError) as e:
+        # e.g., read-only data folder or a csv the cache cannot represent, we fall back to the csv
+        warnings.warn('could not write cache for {}: {}'.format(project_name, e))
+        return _read_project_csv(_project_file(path, project_name), columns=columns, dtype=dtype)
+
+    def load(name, mmap_mode=None):
+        return np.load(os.path.join(cache_folder, name+'.npy'), mmap_mode=mmap_mode)
+
+    if columns is None:
+        columns = meta['columns']
+    else:
+        missing = set(columns).difference(meta['columns'])
+        if missing:
+            raise ValueError('unknown columns: {}'.format(sorted(missing)))
+        columns = [col for col in meta['columns'] if col in columns]
+    columns = [col for col in columns if not col.startswith('induces__')]
+    wanted = set(columns)
+
+    metadata = {}
+    for col in meta['strings']:
+        if col in wanted:
+            metadata[col] = load(col).astype(object)
+    for col in meta['categories']:
+        if col in wanted:
+            metadata[col] = pd.Categorical.from_codes(load(col), dtype=SCHEMA.column(col).dtype)
+    if 'committer_date' in wanted:
+        metadata['committer_date'] = pd.to_datetime(load('committer_date'), utc=True)
+
+    # the features are stored column-major, hence we only read the pages of the requested columns
+    feature_idx = [i for i, col in enumerate(meta['features']) if col in wanted]
+    if len(feature_idx)==len(meta['features']):
+        features = load('features')
+    else:
+        features = np.asfortranarray(load('features', mmap_mode='r')[:, feature_idx])
+    if features.dtype!=dtype:
+        features = features.astype(dtype, order='F')
+    bool_idx = [i for i, col in enumerate(meta['booleans']) if col in wanted]
+    booleans = load('booleans')[:, bool_idx]
+
+    df = pd.concat([pd.DataFrame(metadata),
+                    pd.DataFrame(features, columns=[meta['features'][i] for i in feature_idx], copy=False),
+                    pd.DataFrame(booleans, columns=[meta['booleans'][i] for i in bool_idx])], axis=1)
+    if list(df.columns)!=columns:
+        df = df[columns]
+    df.attrs['cache'] = (cache_folder, meta['checksum'])
+    df.attrs['bug_matrix'] = BugMatrix.from_columns(scipy.sparse.load_npz(os.path.join(cache_folder, 'induces.npz')),
+                                                      meta['induces'], fix_dates=load('bug_fix_date'),
+                                                      row_fix_dates=load('row_fix_dates'))
     return df
 
 
-def load_all_projects(path):
-    """loads all projects from a folder"""
+def load_feature_store(path, project_name, cache_path=None):
+    """return the memory-mapped feature matrix (ALL_FEATURES, float32) of a project and its row index"""
+    cache_folder, meta = _up_to_date_cache(path, project_name, cache_path)
+    store_file = os.path.join(cache_folder, 'feature_store.npy')
+    if not os.path.exists(store_file):
+        # we copy the columns in chunks from the column-major cache to bound the memory
+        # the store is row-major and written to a temporary file first, the boolean columns are stored as 0 and 1
+        features = np.load(os.path.join(cache_folder, 'features.npy'), mmap_mode='r')
+        booleans = np.load(os.path.join(cache_folder, 'booleans.npy'))
+        fd, tmp_file = tempfile.mkstemp(suffix='.npy', dir=cache_folder)
+        os.close(fd)
+        try:
+            store = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=np.float32, shape=(meta['rows'], len(ALL_FEATURES)))
+            for i, col in enumerate(ALL_FEATURES):
+                if col in meta['booleans']:
+                    store[:, i] = booleans[:, meta['booleans'].index(col)]
+            positions = [(i, meta['features'].index(col)) for i, col in enumerate(ALL_FEATURES) if col not in meta['booleans']]
+            for chunk in range(0, len(positions), 256):
+                store_positions, feature_positions = zip(*positions[chunk:chunk+256])
+                store[:, list(store_positions)] = features[:, list(feature_positions)]
+            store.flush()
+            del store
+            os.replace(tmp_file, store_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    # the store is read-only and memory-mapped, hence parallel processes share its pages in the page cache
+    # its rows are aligned with the index of the data frames of load_project
+    rows = pd.DataFrame({'commit': np.load(os.path.join(cache_folder, 'commit.npy')).astype(object),
+                         'committer_date': pd.to_datetime(np.load(os.path.join(cache_folder, 'committer_date.npy')), utc=True),
+                         'file': np.load(os.path.join(cache_folder, 'file.npy')).astype(object)})
+    return np.load(store_file, mmap_mode='r'), rows
+
+
+@profile_stage('load_features')
+def load_features(path, df, features=None, cache_path=None):
+    """return the feature matrix (default: ALL_FEATURES) for the rows of a data frame from load_project"""
+    positions = None
+    if features is not None and list(features)!=ALL_FEATURES:
+        positions = [ALL_FEATURES.index(col) for col in features]
+
+    matrices = []
+    for project_name in pd.unique(df['project']):
+        rows = df.index.to_numpy()[(df['project']==project_name).to_numpy()]
+        store, _ = load_feature_store(path, project_name, cache_path=cache_path)
+        # a contiguous range of rows is a view of the memory-mapped store, other rows are copied
+        if len(rows)>0 and np.array_equal(rows, np.arange(rows[0], rows[0]+len(rows))):
+            matrix = store[rows[0]:rows[0]+len(rows)]
+            if positions is not None:
+                matrix = matrix[:, positions]
+        elif positions is not None:
+            matrix = store[np.ix_(rows, positions)]
+        else:
+            matrix = store[rows]
+        matrices.append(matrix)
+
+    if len(matrices)==1:
+        return matrices[0]
+    if not np.array_equal(df['project'].to_numpy(), np.repeat(pd.unique(df['project']), [len(m) for m in matrices])):
+        raise ValueError('the rows of each project must be consecutive')
+    return np.concatenate(matrices)
+
+
+def feature_statistics(path, project_name, cache_path=None):
+    """return the statistics of the features of a project as data frame with one row per feature of ALL_FEATURES"""
+    # change_date is the first commit with another value than first_value (NaT if constant) and duplicate_of the
+    # first feature with the same values in all rows (the feature itself if there is none)
+    # the statistics are computed once and stored in the cache of the project
+    cache_folder, meta = _up_to_date_cache(path, project_name, cache_path)
+    stats_file = os.path.join(cache_folder, 'feature_stats.npz')
+    names = list(dict.fromkeys(ALL_FEATURES))
+    try:
+        with np.load(stats_file) as stats:
+            stats = {name: stats[name] for name in stats.files}
+    except (OSError, ValueError):
+        stats = _feature_statistics(path, project_name, cache_path)
+        fd, tmp_file = tempfile.mkstemp(suffix='.npz', dir=cache_folder)
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **stats)
+        os.replace(tmp_file, stats_file)
+    stats = pd.DataFrame(stats, index=names)
+    stats['change_date'] = pd.to_datetime(stats['change_date'], utc=True)
+    stats['duplicate_of'] = [names[i] for i in stats['duplicate_of']]
+    return stats
+
+
+def _feature_statistics(path, project_name, cache_path=None, chunk_size=256):
+    """computes the statistics of feature_statistics from the feature store in chunks of columns"""
+    store, rows = load_feature_store(path, project_name, cache_path=cache_path)
+    positions = [ALL_FEATURES.index(name) for name in dict.fromkeys(ALL_FEATURES)]
+    order = np.argsort(_utc_datetime64(rows['committer_date']), kind='stable')
+    dates = _utc_datetime64(rows['committer_date'])[order]
+
+    stats = {'variance': np.empty(len(positions)),
+             'nonzero': np.empty(len(positions), dtype=np.int64),
+             'first_value': np.empty(len(positions), dtype=np.float32),
+             'change_date': np.full(len(positions), np.datetime64('NaT'), dtype='datetime64[ns]'),
+             'duplicate_of': np.arange(len(positions))}
+    first_of_hash = {}
+    for chunk in range(0, len(positions), chunk_size):
+        # the columns are copied in the chronological order of the rows, one column per row of values
+        values = np.ascontiguousarray(store[:, positions[chunk:chunk+chunk_size]][order].T)
+        stats['variance'][chunk:chunk+len(values)] = values.var(axis=1, dtype=np.float64)
+        stats['nonzero'][chunk:chunk+len(values)] = np.count_nonzero(values, axis=1)
+        if len(order)==0:
+            continue
+        stats['first_value'][chunk:chunk+len(values)] = values[:, 0]
+        changed = values!=values[:, :1]
+        is_changed = changed.any(axis=1)
+        stats['change_date'][chunk+np.flatnonzero(is_changed)] = dates[changed.argmax(axis=1)[is_changed]]
+
+        # exact duplicates are found by the hash of their values and confirmed by comparing the values
+        for i, column in enumerate(values):
+            key = hashlib.sha1(column.tobytes()).hexdigest()
+            if key not in first_of_hash:
+                first_of_hash[key] = (chunk+i, column)
+            elif np.array_equal(first_of_hash[key][1], column):
+                stats['duplicate_of'][chunk+i] = first_of_hash[key][0]
+    return stats
+
+
+@profile_stage('prune_features')
+def pruned_features(path, df, features=None, cache_path=None):
+    """return the features (default: ALL_FEATURES) without constant and duplicate features, e.g., of the training data"""
+    # a feature is constant if it does not change until the latest commit of each project in the data and has the
+    # same value in all projects, hence nothing is learned from later commits, e.g., the test data
+    features = list(dict.fromkeys(ALL_FEATURES if features is None else features))
+    constant = pd.Series(True, index=features)
+    first_values = None
+    duplicate_of = None
+    for project_name in pd.unique(df['project']):
+        stats = feature_statistics(path, project_name, cache_path=cache_path).loc[features]
+        latest_commit = df.loc[(df['project']==project_name).to_numpy(), 'committer_date'].max()
+        constant &= ~(stats['change_date']<=latest_commit)
+        if first_values is None:
+            first_values = stats['first_value']
+            duplicate_of = stats['duplicate_of']
+        else:
+            constant &= stats['first_value']==first_values
+            duplicate_of = duplicate_of.where(duplicate_of==stats['duplicate_of'])
+    duplicate = duplicate_of.notna() & (duplicate_of!=duplicate_of.index) & duplicate_of.isin(features)
+    return [feature for feature in features if not constant[feature] and not duplicate[feature]]
+
+
+@profile_stage('load')
+def load_all_projects(path, columns=None):
+    """loads all projects from a folder, optionally only the supplied columns (see load_project)"""
     projects = {}
     for project_name in list_all_projects(path):
-        projects[project_name] = load_project(path=path, project_name=project_name)
+        projects[project_name] = load_project(path=path, project_name=project_name, columns=columns)
     return projects
 
 
@@ -57,183 +778,740 @@ def bugs_later_than(df, cutoff_date):
     if not cutoff_date:
         raise Exception('please supply a cutoff date')
 
-    remove = []
-    for col in df.columns:
-        if col.startswith('induces__'):
-            label, issue_id, bugfix_commit, bugfix_date = col.split('__')
-            if pd.to_datetime(bugfix_date, utc=True) > cutoff_date:
-                remove.append(col)
-    return remove
+    bugs = _project_bugs(df)
+    return bugs.bugs['name'].to_numpy()[bugs.later_than(cutoff_date)].tolist()
 
 
+@profile_stage('prepare')
 def prepare_within_project_data(test_project_df, drop_months_end=3, num_test_commits=250):
-    """takes the data from a project and splits it into training and test data"""
-    
-    # drop end of project
-    # there was no time for bug fixes, meaning the labels are not reliable
-    latest_commit_date = test_project_df['committer_date'].max()
-    cutoff_end = latest_commit_date-relativedelta(months=drop_months_end)
-    test_project_df = test_project_df[test_project_df['committer_date']<cutoff_end]
+    """takes the data from a project and splits it into training and test data
 
-    # use last 500 commits as test data
-    lc = last_commits(test_project_df, num_commits=num_test_commits)
-    test_df = test_project_df[test_project_df['commit'].isin(lc)].copy()
-    train_df = test_project_df[~test_project_df['commit'].isin(lc)].copy()
+    the split, i.e., the rows and labels of the training and test data, is cached (see within_project_split)"""
+    split = within_project_split(test_project_df, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
+
+    test_df = test_project_df.take(split['test'])
+    test_df['is_inducing'] = split['test_labels']
 
     # drop all bugs that were fixed after the test period starts
     # this prevents a time travel information leak
-    test_start_date = test_df['committer_date'].min()
-    late_bugs = bugs_later_than(train_df, cutoff_date=test_start_date)
-    train_df.drop(columns=late_bugs, inplace=True)
+    train_df = test_project_df.take(split['train'])
+    drop_bugs_later_than(train_df, cutoff_date=test_df['committer_date'].min())
+    train_df['is_inducing'] = split['train_labels']
+
+    return train_df, test_df
+
+
+def within_project_split(test_project_df, drop_months_end=3, num_test_commits=250):
+    """return the split of prepare_within_project_data as dictionary with the positions of the rows in
+    test_project_df (train, test) and the binary labels (train_labels, test_labels)
+
+    the split is cached in the cache of the project and reused as long as the data does not change. together with
+    load_feature_store, the rows can be used to get the features without copying the data of the project."""
+    return _cached_split([test_project_df], lambda: _within_project_split(test_project_df, drop_months_end, num_test_commits),
+                         kind='within', drop_months_end=drop_months_end, num_test_commits=num_test_commits)
+
+
+def _within_project_split(test_project_df, drop_months_end, num_test_commits):
+    """computes the split of prepare_within_project_data"""
+    in_project, is_test = _test_rows(test_project_df, drop_months_end, num_test_commits)
+    test = np.flatnonzero(is_test)
 
     # drop last three months of training data
     # there was no time for bug fixes, meaning the labels are not reliable
     # we use the start of the test data as reference
+    test_start_date = test_project_df['committer_date'][is_test].min()
     cutoff_train = test_start_date - relativedelta(months=3)
-    train_df = train_df[train_df['committer_date']<cutoff_train]
+    train = np.flatnonzero(in_project & ~is_test & (test_project_df['committer_date']<cutoff_train).to_numpy())
 
     # finally, we transform the detailed bug matrix into binary labels
-    train_bugs = bug_columns(train_df)
-    train_df['is_inducing'] = train_df[train_bugs].any(axis=1)
-    test_bugs = bug_columns(test_df)
-    test_df['is_inducing'] = test_df[test_bugs].any(axis=1)
+    # only bugs that were fixed before the test period starts count, i.e., earliest fix date<=test start
+    # this prevents a time travel information leak
+    return {'train': train,
+            'train_labels': _inducing_until(test_project_df, train, test_start_date),
+            'test': test,
+            'test_labels': _inducing_until(test_project_df, test)}
 
-    return train_df, test_df
 
-
-def prepare_all_data(test_project_name, projects, drop_months_end=3, num_test_commits=250):
-    """takes the data from the project and splits it into training and test data and also adds all data from other projects that are available"""
-
-    test_project_df = projects[test_project_name]
+def _test_rows(test_project_df, drop_months_end, num_test_commits):
+    """return which rows of a project are used and which are test data"""
 
     # drop end of project
     # there was no time for bug fixes, meaning the labels are not reliable
     latest_commit_date = test_project_df['committer_date'].max()
     cutoff_end = latest_commit_date-relativedelta(months=drop_months_end)
-    test_project_df = test_project_df[test_project_df['committer_date']<cutoff_end]
+    in_project = (test_project_df['committer_date']<cutoff_end).to_numpy()
 
     # use last 500 commits as test data
-    lc = last_commits(test_project_df, num_commits=num_test_commits)
-    test_df = test_project_df[test_project_df['commit'].isin(lc)].copy()
+    lc = last_commits(test_project_df.loc[in_project, ['commit']], num_commits=num_test_commits)
+    is_test = in_project & test_project_df['commit'].isin(lc).to_numpy()
+    return in_project, is_test
 
-    # we compute binary labels for the test data
-    test_bugs = bug_columns(test_df)
-    test_df['is_inducing'] = test_df[test_bugs].any(axis=1)
 
+def _inducing_until(df, rows, cutoff_dates=None):
+    """return the binary labels for the rows (positions) of a data frame, optionally only for bugs fixed until the
+    cutoff date, or one column of labels per cutoff date"""
+    # the labels only require the index and the bug matrix, hence we do not need any columns
+    bugs, index = _bug_rows(df)
+    return bugs.inducing(index[rows], cutoff_dates)
+
+
+def prepare_walk_forward_data(test_project_df, drop_months_end=3, num_test_commits=250, step_commits=50):
+    """takes the data from a project and yields the training and test data of each step of a walk-forward evaluation
+
+    the test commits of prepare_within_project_data are split into chronological batches of step_commits commits.
+    each step tests one batch and trains with everything before it, i.e., the training data grows with each step
+    and also contains earlier batches once they are old enough. with step_commits=num_test_commits, there is only
+    one step, which is the same as prepare_within_project_data."""
+    for split in walk_forward_split(test_project_df, drop_months_end=drop_months_end, num_test_commits=num_test_commits, step_commits=step_commits):
+        test_df = test_project_df.take(split['test'])
+        test_df['is_inducing'] = split['test_labels']
+
+        train_df = test_project_df.take(split['train'])
+        drop_bugs_later_than(train_df, cutoff_date=test_df['committer_date'].min())
+        train_df['is_inducing'] = split['train_labels']
+        yield train_df, test_df
+
+
+def walk_forward_split(test_project_df, drop_months_end=3, num_test_commits=250, step_commits=50):
+    """return the splits of prepare_walk_forward_data as list with one dictionary per step, same as within_project_split"""
+    in_project, is_test = _test_rows(test_project_df, drop_months_end, num_test_commits)
+    committer_date = test_project_df['committer_date']
+
+    # the test commits in chronological order
+    test_commits = committer_date[is_test].groupby(test_project_df['commit'][is_test], sort=False).min()
+    test_commits = test_commits.sort_values(kind='stable').index
+
+    tests = [np.flatnonzero(is_test & test_project_df['commit'].isin(test_commits[start:start+step_commits]).to_numpy())
+             for start in range(0, len(test_commits), step_commits)]
+    test_start_dates = [committer_date.iloc[test].min() for test in tests]
+
+    # the labels of the training data are derived for all steps at once from the fix dates of the bugs,
+    # one column per step with the labels at the start of its batch
+    rows = np.flatnonzero(in_project)
+    labels = _inducing_until(test_project_df, rows, test_start_dates)
+
+    steps = []
+    for step, (test, test_start_date) in enumerate(zip(tests, test_start_dates)):
+        # same as in _within_project_split, but relative to the start of the batch
+        cutoff_train = test_start_date - relativedelta(months=3)
+        is_train = (committer_date.iloc[rows]<cutoff_train).to_numpy()
+        steps.append({'train': rows[is_train],
+                      'train_labels': labels[is_train, step],
+                      'test': test,
+                      'test_labels': _inducing_until(test_project_df, test)})
+    return steps
+
+
+def combine_test_data(test_project_df, test_dfs):
+    """return the test data of several steps of prepare_walk_forward_data as one data frame, e.g., for cumulative scores"""
+    test_df = test_project_df.take(test_project_df.index.get_indexer(np.concatenate([df.index.to_numpy() for df in test_dfs])))
+    test_df['is_inducing'] = np.concatenate([df['is_inducing'].to_numpy() for df in test_dfs])
+    return test_df
+
+
+def _cached_split(frames, compute, **params):
+    """return a split of the data of projects that is computed once and then stored in the cache of the first project
+
+    the key of the split are the params, the checksums of the projects, the rows of the frames, the SPLIT_VERSION,
+    and the source of the functions that compute the split. splits of frames that were not loaded from the cache
+    are not cached."""
+    key = hashlib.sha1(json.dumps(params, sort_keys=True).encode())
+    key.update('{}:{}'.format(SPLIT_VERSION, _split_source_hash()).encode())
+    for df in frames:
+        if 'cache' not in df.attrs:
+            return compute()
+        key.update(df.attrs['cache'][1].encode())
+        key.update(df.index.to_numpy().tobytes())
+    split_file = os.path.join(frames[0].attrs['cache'][0], 'splits', key.hexdigest()+'.npz')
+
+    try:
+        with np.load(split_file) as split:
+            return {name: split[name] for name in split.files}
+    except (OSError, ValueError):
+        pass
+
+    split = compute()
+    try:
+        os.makedirs(os.path.dirname(split_file), exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(split_file))
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **split)
+        os.replace(tmp_file, split_file)
+    except OSError as e:
+        warnings.warn('could not cache split: {}'.format(e))
+    return split
+
+
+@functools.lru_cache(maxsize=None)
+def _split_source_hash():
+    """return the hash of the source of the functions that compute the splits, computed once per process"""
+    sha1 = hashlib.sha1()
+    for function in [BugMatrix, last_commits, _test_rows, _inducing_until, _within_project_split, _train_projects, _all_data_split]:
+        sha1.update(inspect.getsource(function).encode())
+    return sha1.hexdigest()
+
+
+@profile_stage('prepare')
+def prepare_all_data(test_project_name, projects, drop_months_end=3, num_test_commits=250):
+    """takes the data from the project and splits it into training and test data and also adds all data from other projects that are available
+
+    the split, i.e., the rows and labels of the training and test data, is cached (see all_data_split)"""
+    split = all_data_split(test_project_name, projects, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
+
+    test_df = projects[test_project_name].take(split['test'])
+    test_df['is_inducing'] = split['test_labels']
+
+    train_projects = _train_projects(test_project_name, projects)
+    train_df = _concat_rows([projects[project] for project in train_projects],
+                            [split['train_{}'.format(i)] for i in range(len(train_projects))])
+    train_df['is_inducing'] = np.concatenate([split['train_labels_{}'.format(i)] for i in range(len(train_projects))])
+
+    # same as prepare_within_project_data, the bugs fixed after the test period starts are dropped
+    drop_bugs_later_than(train_df, cutoff_date=test_df['committer_date'].min())
+    return train_df, test_df
+
+
+def all_data_split(test_project_name, projects, drop_months_end=3, num_test_commits=250):
+    """return the split of prepare_all_data as dictionary with the positions of the rows of the test data (test)
+    and the training data of each project (train_<i>) and their binary labels (test_labels, train_labels_<i>)
+
+    the training projects are numbered in the order of _train_projects, i.e., the test project first. the split is
+    cached in the cache of the test project and reused as long as the data of the projects does not change."""
+    train_projects = _train_projects(test_project_name, projects)
+    return _cached_split([projects[project] for project in train_projects],
+                         lambda: _all_data_split(test_project_name, projects, drop_months_end, num_test_commits),
+                         kind='all', projects=train_projects, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
+
+
+def _train_projects(test_project_name, projects):
+    """return the projects used for training by prepare_all_data, the test project first"""
+    return [test_project_name]+[project for project in projects if project!=test_project_name]
+
+
+def _all_data_split(test_project_name, projects, drop_months_end, num_test_commits):
+    """computes the split of prepare_all_data"""
+    test_project_df = projects[test_project_name]
+    in_project, is_test = _test_rows(test_project_df, drop_months_end, num_test_commits)
+    test = np.flatnonzero(is_test)
+
+    # we compute binary labels for the test data
+    split = {'test': test, 'test_labels': _inducing_until(test_project_df, test)}
 
     # now we prepare the training data
+    # we only use training data prior to three months before the test data starts
+    # there was no time for bug fixes, meaning the labels are not reliable
+    test_start_date = test_project_df['committer_date'][is_test].min()
+    cutoff_train = test_start_date - relativedelta(months=3)
+
     # first, we take the commits prior to the test data from the target project
-    train_df = test_project_df[~test_project_df['commit'].isin(lc)].copy()
-
-    # we also drop all bugs, that were reported after the test period starts
-    test_start_date = test_df['committer_date'].min()
-    late_bugs = bugs_later_than(train_df, cutoff_date=test_start_date)
-    train_df.drop(columns=late_bugs, inplace=True)
-
-    # then we compute binary labels and drop the bug matrix completely
-    train_bugs = bug_columns(train_df)
-    train_df['is_inducing'] = train_df[train_bugs].any(axis=1)
-    bug_matrix_cols = [col for col in train_df.columns if col.startswith('induces__')]
-    train_df.drop(columns=bug_matrix_cols, inplace=True)
-
-    # now we add all commits from other projects, prior to the cutoff date
-    # the treatment of the data is the same
-    for project in projects:
+    # then we add all commits from other projects, prior to the cutoff date
+    # the treatment of the data is the same: we drop all bugs that were fixed after the test period starts,
+    # compute binary labels, and drop the bug matrix completely
+    for i, project in enumerate(_train_projects(test_project_name, projects)):
+        project_df = projects[project]
+        is_train = (project_df['committer_date']<cutoff_train).to_numpy()
         if project==test_project_name:
+            is_train = is_train & in_project & ~is_test
+        train = np.flatnonzero(is_train)
+        split['train_{}'.format(i)] = train
+        split['train_labels_{}'.format(i)] = _inducing_until(project_df, train, test_start_date)
+    return split
+
+
+def _concat_rows(frames, rows, chunk_size=256):
+    """concatenates the selected rows (positions) of data frames in a single pass, missing columns are NaN"""
+    columns = []
+    dtypes = {}
+    for frame in frames:
+        for col in frame.columns:
+            if col not in dtypes:
+                columns.append(col)
+                dtypes[col] = frame[col].dtype
+    numeric_cols = [col for col in columns if pd.api.types.is_numeric_dtype(dtypes[col]) and not pd.api.types.is_bool_dtype(dtypes[col])]
+    other_cols = [col for col in columns if col not in numeric_cols]
+
+    # the numeric columns are copied in chunks of columns into one preallocated matrix without temporary copies of
+    # whole frames, it is float32 unless the frames have wider columns, e.g., from load_project(..., dtype=np.float64)
+    dtype = np.result_type(np.float32, *[dtypes[col] for col in numeric_cols])
+    values = np.empty((sum(len(frame_rows) for frame_rows in rows), len(numeric_cols)), dtype=dtype, order='F')
+    start = 0
+    for frame, frame_rows in zip(frames, rows):
+        stop = start+len(frame_rows)
+        positions = frame.columns.get_indexer(numeric_cols)
+        values[start:stop, positions<0] = np.nan
+        for chunk in range(0, len(numeric_cols), chunk_size):
+            chunk_positions = positions[chunk:chunk+chunk_size]
+            present = chunk_positions>=0
+            values[start:stop, chunk+np.flatnonzero(present)] = frame.iloc[frame_rows, chunk_positions[present]].to_numpy(dtype=dtype)
+        start = stop
+
+    index = np.concatenate([frame.index.to_numpy()[frame_rows] for frame, frame_rows in zip(frames, rows)])
+    others = pd.concat([frame.reindex(columns=other_cols).iloc[frame_rows] for frame, frame_rows in zip(frames, rows)])
+    df = pd.DataFrame(values, columns=numeric_cols, index=pd.Index(index, name=ROW_INDEX), copy=False)
+    for col in other_cols:
+        df.insert(columns.index(col), col, others[col].array)
+
+    bug_matrices = {}
+    for frame in frames:
+        if 'bug_matrix' in frame.attrs and frame.attrs['bug_matrix'].offsets is None and 'project' in frame and frame['project'].nunique()==1:
+            bug_matrices[frame['project'].iloc[0]] = frame.attrs['bug_matrix']
+    if len(bug_matrices)==len(frames):
+        df.attrs['bug_matrix'] = BugMatrix.combine(bug_matrices)
+    return df
+
+
+def memory_budget(default_gb=8):
+    """return the memory budget of the process in bytes
+
+    the budget is the environment variable PROMISE_MEMORY_GB or, otherwise, half of the address-space limit of
+    the process (e.g., set by run_all.py --memory-gb), because the libraries also reserve address space. without
+    both, the budget is default_gb."""
+    if os.environ.get('PROMISE_MEMORY_GB'):
+        return int(float(os.environ['PROMISE_MEMORY_GB'])*1024**3)
+    limit, _ = resource.getrlimit(resource.RLIMIT_AS)
+    if limit!=resource.RLIM_INFINITY:
+        return limit//2
+    return int(default_gb*1024**3)
+
+
+def training_chunks(train_df, max_rows, random_state=None):
+    """splits the rows of the training data into chunks with at most max_rows rows
+
+    whole projects are packed into the chunks in the order of train_df. projects with more than max_rows rows are
+    split randomly into chunks of equal size, stratified by is_inducing, such that each chunk has its share of
+    the inducing rows. returns the positions of the rows of each chunk in train_df. the positions are sorted,
+    hence the rows of each project are consecutive within a chunk (see load_features)."""
+    rng = np.random.RandomState(random_state)
+    projects = train_df['project'].to_numpy()
+    labels = train_df['is_inducing'].to_numpy(dtype=bool)
+
+    chunks = []
+    current = []
+    for project_name in pd.unique(projects):
+        rows = np.flatnonzero(projects==project_name)
+        if len(rows)>max_rows:
+            num_chunks = -(-len(rows)//max_rows)
+            parts = [[] for _ in range(num_chunks)]
+            # we deal the shuffled rows of each class in turns, which keeps the chunks stratified and of equal size
+            dealt = 0
+            for label in [True, False]:
+                label_rows = rng.permutation(rows[labels[rows]==label])
+                for i in range(num_chunks):
+                    parts[(dealt+i)%num_chunks].append(label_rows[i::num_chunks])
+                dealt += len(label_rows)
+            chunks.extend(np.sort(np.concatenate(part)) for part in parts)
             continue
-        other_df = projects[project].copy()
-        other_df = other_df[other_df['committer_date']<test_start_date]
-        late_bugs = bugs_later_than(other_df, cutoff_date=test_start_date)
-        other_df.drop(columns=late_bugs, inplace=True)
-        train_bugs = bug_columns(other_df)
-        other_df['is_inducing'] = other_df[train_bugs].any(axis=1)
-        bug_matrix_cols = [col for col in other_df.columns if col.startswith('induces__')]
-        other_df.drop(columns=bug_matrix_cols, inplace=True)
-        train_df = train_df.append(other_df)
+        if sum(len(chunk_rows) for chunk_rows in current)+len(rows)>max_rows:
+            chunks.append(np.concatenate(current))
+            current = []
+        current.append(rows)
+    if current:
+        chunks.append(np.concatenate(current))
+    return chunks
 
-    # drop last three months of training data
-    # there was no time for bug fixes, meaning the labels are not reliable
-    # we use the start of the test data as reference
-    cutoff_train = test_start_date - relativedelta(months=3)
-    train_df = train_df[train_df['committer_date']<cutoff_train]
 
-    return train_df, test_df
+# cost factors C (costs of a defect per line of code) for which score_model computes the costs
+COST_FACTORS = [1000, 10000]
+
+
+def _efforts(test_df):
+    """return the effort to review each file, i.e., the added and deleted lines"""
+    return (test_df['la']+test_df['ld']).to_numpy(dtype=np.float64)
+
+
+def _scoring_data(test_df):
+    """return everything the scores need from the test data, such that it is only computed once
+
+    this is the labels, the efforts, the transposed bug matrix (bugs x files), and the number of files that induce
+    each bug. a bug is found if all files that induce it are predicted as inducing, i.e., if the number of predicted
+    files that induce it is the number of files that induce it. everything is float64 to use matrix products, which
+    is exact because all values are counts of files or lines."""
+    matrix, _ = bug_matrix(test_df)
+    matrix = matrix.T.tocsr().astype(np.float64)
+    return {'labels': test_df['is_inducing'].to_numpy(dtype=np.float64),
+            'efforts': _efforts(test_df),
+            'matrix': matrix,
+            'bug_sizes': np.asarray(matrix.sum(axis=1)).ravel()}
+
+
+def _mcc(labels, predictions):
+    """calculates the matthews correlation coefficient of each row of predictions
+
+    uses the same formula as sklearn.metrics.matthews_corrcoef, hence the results are identical"""
+    n_samples = np.float64(len(labels))
+    tp = predictions.dot(labels)
+    predicted = predictions.sum(axis=1)
+    positives = labels.sum()
+    tn = n_samples-predicted-positives+tp
+    true_sum = (n_samples-positives, positives)
+    pred_sum = (n_samples-predicted, predicted)
+    cov_ytyp = (tp+tn)*n_samples-(true_sum[0]*pred_sum[0]+true_sum[1]*pred_sum[1])
+    cov_ypyp = n_samples**2-(pred_sum[0]**2+pred_sum[1]**2)
+    cov_ytyt = n_samples**2-(true_sum[0]**2+true_sum[1]**2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mcc = cov_ytyp/np.sqrt(cov_ytyt*cov_ypyp)
+    return np.where(cov_ypyp*cov_ytyt==0, 0.0, mcc)
+
+
+def _batch_scores(data, predictions, cost_factors=COST_FACTORS):
+    """calculates the mcc, both bounds of the cost saving range, and the costs for each cost factor C for each row
+    of predictions, i.e., for a matrix with one row of predictions per candidate and one column per test row
+
+    all candidates are scored together with matrix products against the bug matrix and the efforts"""
+    predictions = np.asarray(predictions, dtype=bool).astype(np.float64)
+    efforts = data['efforts']
+    effort_true = predictions.dot(efforts)
+    effort_false = efforts.sum()-effort_true
+    bugs_found = (data['matrix'].dot(predictions.T)==data['bug_sizes'][:, np.newaxis]).sum(axis=0)
+    bugs_missed = len(data['bug_sizes'])-bugs_found
+    scores = {}
+    scores['mcc'] = _mcc(data['labels'], predictions)
+    scores['c_lower'] = effort_true/bugs_found
+    scores['c_upper'] = effort_false/bugs_missed
+    # the costs are counts of lines, hence they are exact integers
+    for C in cost_factors:
+        scores['cost_{}'.format(C)] = np.rint(effort_true+C*bugs_missed).astype(np.int64)
+    return scores
+
+
+def _scores(data, predictions, cost_factors=COST_FACTORS):
+    """calculates the scores for a single vector of predictions"""
+    scores = _batch_scores(data, np.asarray(predictions)[np.newaxis, :], cost_factors)
+    return {name: values[0] for name, values in scores.items()}
 
 
 def lower_bound(test_df, predictions):
     """calculates the lower bound of the cost saving range"""
-    bug_matrix_cols = [col for col in test_df.columns if col.startswith('induces__')]
-    bug_matrix = test_df.loc[:,bug_matrix_cols]
-    efforts = test_df['la']+test_df['ld']
-    effort_true = efforts[predictions].sum()
-    bugs_found = bug_matrix.sum().eq(bug_matrix[predictions].sum()).sum()
-    return effort_true/bugs_found
+    return _scores(_scoring_data(test_df), predictions, cost_factors=[])['c_lower']
 
 
 def upper_bound(test_df, predictions):
     """calculates the upper bound of the cost saving range"""
-    bug_matrix_cols = [col for col in test_df.columns if col.startswith('induces__')]
-    bug_matrix = test_df.loc[:,bug_matrix_cols]
-    efforts = test_df['la']+test_df['ld']
-    effort_false = efforts[~predictions].sum()
-    bugs_missed = len(bug_matrix.columns)-bug_matrix.sum().eq(bug_matrix[predictions].sum()).sum()
-    return effort_false/bugs_missed
+    return _scores(_scoring_data(test_df), predictions, cost_factors=[])['c_upper']
 
 
 def costs(test_df, predictions, C):
     """calculates the costs given the cost of defects per line of code C"""
-    bug_matrix_cols = [col for col in test_df.columns if col.startswith('induces__')]
-    bug_matrix = test_df.loc[:,bug_matrix_cols]
-    efforts = test_df['la']+test_df['ld']
-    effort_true = efforts[predictions].sum()
-    bugs_missed = len(bug_matrix.columns)-bug_matrix.sum().eq(bug_matrix[predictions].sum()).sum()
-    return effort_true+C*bugs_missed
+    return _scores(_scoring_data(test_df), predictions, cost_factors=[C])['cost_{}'.format(C)]
 
 
+@profile_stage('score')
 def score_model(test_df, y_pred):
     """calculates the scores for a model"""
+    return _scores(_scoring_data(test_df), y_pred)
+
+
+@profile_stage('score')
+def score_models(test_df, predictions):
+    """calculates the scores for many candidates at once, e.g., different thresholds or members of an ensemble
+
+    predictions has one row per candidate and one column per row of test_df. returns a data frame with one row
+    per candidate and the same scores as score_model as columns."""
+    return pd.DataFrame(_batch_scores(_scoring_data(test_df), predictions))
+
+
+def cost_optimal_threshold(df, scores, C):
+    """return the threshold for scores>=threshold (inf if nothing) with the lowest costs (see costs) and these costs"""
+    # the files are sorted by their score once, the costs of all thresholds follow from the cumulative efforts and
+    # the cumulative number of found bugs
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.argsort(-scores, kind='stable')
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(len(scores))
+
+    # number of predicted files after which each bug is found, bugs without files are always found
+    matrix, _ = bug_matrix(df)
+    matrix = matrix.tocoo()
+    found_after = np.zeros(matrix.shape[1], dtype=np.int64)
+    np.maximum.at(found_after, matrix.col, ranks[matrix.row]+1)
+    bugs_found = np.cumsum(np.bincount(found_after, minlength=len(scores)+1))
+
+    effort_true = np.concatenate([[0.0], np.cumsum(_efforts(df)[order])])
+    total_costs = effort_true+C*(matrix.shape[1]-bugs_found)
+
+    # files with the same score are predicted together, hence only the ends of ties are valid cut-offs
+    sorted_scores = scores[order]
+    valid = np.ones(len(scores)+1, dtype=bool)
+    valid[1:-1] = sorted_scores[:-1]>sorted_scores[1:]
+    best = np.flatnonzero(valid)[np.argmin(total_costs[valid])]
+    threshold = sorted_scores[best-1] if best>0 else np.inf
+    return threshold, total_costs[best]
+
+
+def validate_float32(path, project_name, model=None, drop_months_end=3, num_test_commits=250, rtol=1e-6):
+    """confirms that the float32 data gives the same scores as the float64 data of the csv
+
+    the model (an unfitted estimator) is fitted and scored once with the features of the feature store (float32) and
+    once with the features parsed from the csv (float64) with the split of prepare_within_project_data. by default,
+    it is the pipeline of the baselines, i.e., SMOTE and a random forest, because SMOTE computes the distances in the
+    dtype of the features, while a random forest alone converts them to float32 anyway. returns a data frame with
+    both scores and raises a ValueError if the labels of the split differ or a score differs by more than rtol."""
+    from sklearn.base import clone
+    from sklearn.ensemble import RandomForestClassifier
+    if model is None:
+        from imblearn.over_sampling import SMOTE
+        from imblearn.pipeline import make_pipeline
+        model = make_pipeline(SMOTE(random_state=42), RandomForestClassifier(random_state=42))
+
     scores = {}
-    scores['mcc'] = matthews_corrcoef(test_df['is_inducing'], y_pred)
-    scores['c_lower'] = lower_bound(test_df, y_pred)
-    scores['c_upper'] = upper_bound(test_df, y_pred)
-    scores['cost_1000']  = costs(test_df, y_pred, 1000)
-    scores['cost_10000'] = costs(test_df, y_pred, 10000)
+    labels = {}
+    for name, dtype in [('float32', np.float32), ('float64', np.float64)]:
+        if dtype==np.float32:
+            data = load_project(path, project_name, columns=[])
+        else:
+            data = load_project(path, project_name, use_cache=False, dtype=np.float64)
+        train_df, test_df = prepare_within_project_data(data, drop_months_end=drop_months_end, num_test_commits=num_test_commits)
+        if dtype==np.float32:
+            X_train, X_test = load_features(path, train_df), load_features(path, test_df)
+        else:
+            X_train, X_test = train_df[ALL_FEATURES].to_numpy(dtype=dtype), test_df[ALL_FEATURES].to_numpy(dtype=dtype)
+        labels[name] = (train_df['is_inducing'].to_numpy(), test_df['is_inducing'].to_numpy())
+        y_pred = clone(model).fit(X_train, labels[name][0]).predict(X_test)
+        scores[name] = score_model(test_df, y_pred)
+
+    if any(not np.array_equal(a, b) for a, b in zip(labels['float32'], labels['float64'])):
+        raise ValueError('the labels of {} differ between float32 and float64'.format(project_name))
+    scores = pd.DataFrame(scores)
+    if not np.allclose(scores['float32'], scores['float64'], rtol=rtol, atol=0, equal_nan=True):
+        raise ValueError('the scores of {} differ between float32 and float64:\n{}'.format(project_name, scores))
     return scores
 
 
+@profile_stage('print_summary')
 def print_summary(train_df, test_df, scores):
     """prints a summary of the data and scores"""
-    print('train instances: {} ({} positive)'.format(len(train_df), sum(train_df['is_inducing'])))
-    print('test instances:  {} ({} positive)'.format(len(test_df),  sum(test_df['is_inducing'])))
+    _print_summary(_summary(train_df, test_df), scores)
+
+
+def _summary(train_df, test_df):
+    """return the number of instances and positive instances of the training and test data"""
+    return {'train': [len(train_df), int(sum(train_df['is_inducing']))],
+            'test': [len(test_df), int(sum(test_df['is_inducing']))]}
+
+
+def _print_summary(summary, scores):
+    """prints a summary of the data and scores"""
+    print('train instances: {} ({} positive)'.format(*summary['train']))
+    print('test instances:  {} ({} positive)'.format(*summary['test']))
     
     for metric, score in scores.items():
         print(metric.ljust(16), score)
     print()
 
-    
-def write_scores(path, approach_name, project, scores):
-    """writes the scores to a csv file"""
+
+def run_key(approach_file, data_path, project_names, **params):
+    """return the content-addressed key of a run of an approach
+
+    the key is the hash of all python files of the approach (e.g., approach.py and utils.py), the data of the
+    projects used by the run, and the parameters (e.g., drop_months_end, num_test_commits, random seed). if none of
+    them changes, the run would compute the same results, hence they can be reused (see load_run)."""
+    sha1 = hashlib.sha1()
+    approach_folder = os.path.dirname(os.path.abspath(approach_file))
+    for file in sorted(os.listdir(approach_folder)):
+        if file.endswith('.py'):
+            sha1.update('{}:{}\n'.format(file, _file_checksum(os.path.join(approach_folder, file))).encode())
+    for project_name in sorted(project_names):
+        sha1.update('{}:{}\n'.format(project_name, _file_checksum(_project_file(data_path, project_name))).encode())
+    sha1.update(json.dumps(params, sort_keys=True).encode())
+    return sha1.hexdigest()
+
+
+def _run_file(path, key):
+    """return the file of a stored run"""
+    return os.path.join(path, 'runs', key+'.json')
+
+
+def load_run(path, key):
+    """return the stored run with the key (see store_run) or None
+
+    runs are never reused if the environment variable PROMISE_RERUN is set"""
+    if os.environ.get('PROMISE_RERUN'):
+        return None
+    try:
+        with open(_run_file(path, key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_run(path, key, train_df, test_df, y_pred, scores):
+    """stores the predictions, scores, and summary of a run in <path>/runs, such that it can be reused"""
+    run = {'summary': _summary(train_df, test_df),
+           'predictions': np.asarray(y_pred).tolist(),
+           'scores': scores}
+    file_name = _run_file(path, key)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(suffix='.json', dir=os.path.dirname(file_name))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(run, f, default=_json_value)
+    os.replace(tmp_file, file_name)
+
+
+def replay_run(path, approach_name, project, run, params=None):
+    """prints the summary of a stored run and writes its scores, instead of running the approach again"""
+    print('reusing the results of an earlier run')
+    _print_summary(run['summary'], run['scores'])
+    write_scores(path, approach_name, project, run['scores'], params=params)
+
+
+@profile_stage('models')
+def model_info(train_df, X_train, features, estimator=None, approach_file=None, **params):
+    """return what identifies a model for load_model and store_model, i.e., its training data, estimator, and approach"""
+    # X_train may also be an iterable of consecutive parts of the feature matrix, e.g., one matrix per project
+    sha1 = hashlib.sha1(json.dumps(list(features)).encode())
+    if isinstance(X_train, np.ndarray):
+        X_train = [X_train]
+    # the rows are hashed in chunks, such that memory-mapped features are not copied as a whole
+    for X in X_train:
+        for chunk in range(0, len(X), 4096):
+            sha1.update(np.ascontiguousarray(X[chunk:chunk+4096]).tobytes())
+    sha1.update(train_df['is_inducing'].to_numpy(dtype=bool).tobytes())
+    sha1.update(json.dumps(params, sort_keys=True).encode())
+
+    # a stored model is not reused after the configuration of the estimator or the code of the approach changed
+    model_sha1 = hashlib.sha1()
+    if estimator is not None:
+        model_sha1.update('{}:{}'.format(type(estimator).__name__, sorted(estimator.get_params().items())).encode())
+    if approach_file is not None:
+        model_sha1.update(_file_checksum(os.path.abspath(approach_file)).encode())
+    return {'features': list(features),
+            'cutoff_date': train_df['committer_date'].max().isoformat(),
+            'commits': np.unique((train_df['project']+'/'+train_df['commit']).to_numpy(dtype=str)),
+            'data_hash': sha1.hexdigest(),
+            'model_hash': model_sha1.hexdigest()}
+
+
+def _model_file(path, name):
+    """return the file of a stored model"""
+    return os.path.join(path, 'models', name+'.joblib')
+
+
+@profile_stage('models')
+def load_model(path, name, info, update=False):
+    """return the stored model with the name (see store_model) and whether it was trained with the same data"""
+    # models are never reused if the environment variable PROMISE_RETRAIN is set
+    if os.environ.get('PROMISE_RETRAIN'):
+        return None, False
+    try:
+        stored = joblib.load(_model_file(path, name))
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None, False
+    if stored['features']!=info['features'] or stored.get('model_hash')!=info['model_hash']:
+        return None, False
+    if stored['data_hash']==info['data_hash']:
+        return stored['model'], True
+    # with update, a model is returned as outdated if only new training commits were added, e.g., to add trees
+    if update and stored['cutoff_date']<=info['cutoff_date'] and np.isin(stored['commits'], info['commits']).all():
+        return stored['model'], False
+    return None, False
+
+
+@profile_stage('models')
+def store_model(path, name, model, info):
+    """stores a fitted model with its info (see model_info) in <path>/models, e.g., for serve.py of baseline_rf_wp"""
+    file_name = _model_file(path, name)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(suffix='.joblib', dir=os.path.dirname(file_name))
+    os.close(fd)
+    try:
+        joblib.dump(dict(info, model=model), tmp_file)
+        os.replace(tmp_file, file_name)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def write_scores(path, approach_name, project, scores, params=None, run_id=None):
+    """writes the scores to <path>/scores.sqlite and exports the latest scores of each project to <path>/<approach_name>.csv
+
+    the store keeps the scores of all runs and is the source of truth, delete scores.sqlite to clear it"""
+    with profile_stage('write_scores'):
+        _write_scores(path, approach_name, project, scores, params, run_id)
+    if PROFILE:
+        _write_profile(path, approach_name, project)
+
+
+def _write_scores(path, approach_name, project, scores, params, run_id):
+    """writes the scores to the result store and exports them to a csv file, see write_scores"""
     if not path.endswith('/') and len(path)>0:
         path += '/'
     file_name = path+approach_name+'.csv'
-    values = []
-    values.append(project)
-    for score_value in scores.values():
-        values.append(score_value)
-
-    write_header = True
-    if os.path.exists(file_name) and os.path.getsize(file_name)>0:
-        write_header = False
-
-    with open(file_name, 'a') as f:
-        writer = csv.writer(f)
-        if write_header:
-            header = []
-            header.append('project')
-            for score_name in scores:
-                header.append(score_name)
-            writer.writerow(header)
-        writer.writerow(values)
+    # the run_id defaults to the environment variable PROMISE_RUN_ID or a new id for each process
+    if run_id is None:
+        run_id = RUN_ID
+    params = '' if params is None else json.dumps(params, sort_keys=True)
+
+    # the store serializes concurrent writers, the scores are keyed by the approach, project, run_id, and params,
+    # such that re-runs with the same run_id replace their scores instead of duplicating them
+    # the replaced scores get a new id, because the latest id of each project is exported
+    con = sqlite3.connect(path+'scores.sqlite', timeout=600, isolation_level=None)
+    try:
+        # the immediate transaction locks the store until the csv is exported
+        con.execute('BEGIN IMMEDIATE')
+        con.execute('CREATE TABLE IF NOT EXISTS scores (id INTEGER PRIMARY KEY, approach TEXT, project TEXT, run_id TEXT, '
+                    'params TEXT, scores TEXT, UNIQUE(approach, project, run_id, params))')
+        if con.execute('SELECT COUNT(*) FROM scores WHERE approach=?', (approach_name,)).fetchone()[0]==0:
+            _import_scores(con, file_name, approach_name)
+        con.execute('INSERT OR REPLACE INTO scores (approach, project, run_id, params, scores) VALUES (?, ?, ?, ?, ?)',
+                    (approach_name, project, run_id, params, json.dumps(scores, default=_json_value)))
+        _export_scores(con, file_name, approach_name)
+        con.execute('COMMIT')
+    except BaseException:
+        if con.in_transaction:
+            con.execute('ROLLBACK')
+        raise
+    finally:
+        con.close()
+
+
+def _json_value(value):
+    """converts numpy scalars for json"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError('{} is not JSON serializable'.format(type(value)))
+
+
+def _import_scores(con, file_name, approach_name):
+    """imports the scores of an approach from a csv file that was written without the result store"""
+    if not os.path.exists(file_name) or os.path.getsize(file_name)==0:
+        return
+    with open(file_name) as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            project = row.pop('project')
+            scores = {}
+            for metric, value in row.items():
+                for parse in (int, float):
+                    try:
+                        scores[metric] = parse(value)
+                        break
+                    except (TypeError, ValueError):
+                        scores[metric] = value
+            con.execute('INSERT INTO scores (approach, project, run_id, params, scores) VALUES (?, ?, ?, ?, ?)',
+                        (approach_name, project, 'csv-{}'.format(i), '', json.dumps(scores)))
+
+
+def _export_scores(con, file_name, approach_name):
+    """exports the latest scores of each project of an approach from the result store to a csv file"""
+    rows = []
+    header = ['project']
+    for project, scores in con.execute('SELECT project, scores FROM scores WHERE id IN (SELECT MAX(id) FROM scores '
+                                       'WHERE approach=? GROUP BY project) ORDER BY id', (approach_name,)):
+        scores = json.loads(scores)
+        header.extend(metric for metric in scores if metric not in header)
+        rows.append(dict(scores, project=project))
+
+    # we write a temporary file and move it in place, such that readers never see a partial file
+    # the store is locked during the export, hence the name of the temporary file is unique
+    tmp_file = file_name+'.tmp'
+    try:
+        with open(tmp_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=header)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_file, file_name)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
 
 # Constants for feature sets
 
@@ -300,3 +1578,153 @@ for s in STATIC_METHOD:
 STATIC_FEATURES = STATIC_FILE_FEATURES + STATIC_CLASS_FEATURES + STATIC_INTERFACE_FEATURES + STATIC_ENUM_FEATURES + STATIC_METHOD_FEATURES
 ALL_FEATURES = STATIC_FEATURES + FGJIT_FEATURES + JIT_FEATURES + WD_FEATURES + PMD_FEATURES
 
+# the FGJIT, JIT, and WD features are counts (int32), except for these floats and booleans
+# the static features are floats (e.g., averages), the PMD features are counts of warnings
+FLOAT_FEATURES = ['add', 'del', 'oexp', 'exp', 'entropy', 'lt', 'kamei_entropy', 'kamei_age', 'kamei_rexp',
+                  'sm_current_WD', 'sm_parent_WD', 'sm_delta_WD']
+BOOLEAN_FEATURES = ['own', 'fix_bug', 'kamei_fix']
+
+# values of change_type (ModificationType of pydriller)
+CHANGE_TYPES = ['ModificationType.ADD', 'ModificationType.COPY', 'ModificationType.RENAME', 'ModificationType.DELETE',
+                'ModificationType.MODIFY', 'ModificationType.UNKNOWN']
+
+
+class SchemaColumn:
+    """declared dtype, feature group, and nullability of a column of the csv files"""
+
+    def __init__(self, name, dtype, group, nullable=False):
+        self.name = name
+        self.dtype = dtype
+        self.group = group
+        self.nullable = nullable
+
+    def __repr__(self):
+        return 'SchemaColumn({!r}, {}, {!r}, nullable={})'.format(self.name, self.dtype, self.group, self.nullable)
+
+
+class Schema:
+    """declared layout of the csv files of the projects, which drives the parser, the cache, and the validation"""
+
+    def __init__(self, columns, prefixes):
+        self.columns = {column.name: column for column in columns}
+        # the columns of the bug matrix are declared by their prefix, because their names depend on the project
+        self.prefixes = prefixes
+
+    def declared(self, name):
+        """return if a column is part of the schema"""
+        return name in self.columns or any(name.startswith(prefix) for prefix in self.prefixes)
+
+    def column(self, name):
+        """return the declared column, columns that are not part of the schema raise a ValueError"""
+        if name in self.columns:
+            return self.columns[name]
+        for prefix, column in self.prefixes.items():
+            if name.startswith(prefix):
+                return SchemaColumn(name, column.dtype, column.group, column.nullable)
+        raise ValueError('column {} is not part of the schema'.format(name))
+
+    def group(self, group):
+        """return the names of the declared columns of a group in declaration order"""
+        return [name for name, column in self.columns.items() if column.group==group]
+
+    def kind(self, name):
+        """return how a column is stored in the cache: string, date, category, boolean, induces, or feature"""
+        column = self.column(name)
+        if column.group=='bugs':
+            return 'induces'
+        if column.dtype==str:
+            return 'string'
+        if isinstance(column.dtype, pd.DatetimeTZDtype):
+            return 'date'
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return 'category'
+        if column.dtype==bool:
+            return 'boolean'
+        return 'feature'
+
+    def csv_dtypes(self, names, dtype=np.float32):
+        """return the dtypes for pd.read_csv, the float32 columns are parsed with the supplied dtype"""
+        # the dates are converted afterwards, the int32 columns are parsed as float64 and checked by validate
+        dtypes = {}
+        for name in names:
+            column = self.column(name)
+            if isinstance(column.dtype, pd.DatetimeTZDtype):
+                dtypes[name] = str
+            elif column.dtype==np.float32:
+                dtypes[name] = dtype
+            elif column.dtype==np.int32:
+                dtypes[name] = np.float64
+            else:
+                dtypes[name] = column.dtype
+        return dtypes
+
+    def validate(self, df, name='data'):
+        """check that a data frame (e.g., a chunk of the csv) matches the schema, raises a ValueError with all problems"""
+        problems = []
+        columns = {col: self.column(col) for col in df.columns if self.declared(col)}
+        undeclared = [col for col in df.columns if col!='project' and not self.declared(col)]
+        if undeclared:
+            warnings.warn('{} has columns that are not part of the schema: {}'.format(name, ', '.join(undeclared)))
+
+        not_nullable = [col for col, column in columns.items() if not column.nullable]
+        missing = df[not_nullable].isna().any()
+        problems.extend('{} has missing values'.format(col) for col in missing.index[missing.to_numpy()])
+        for col, column in columns.items():
+            if column.dtype==bool and not pd.api.types.is_bool_dtype(df[col]):
+                problems.append('{} is {}, not bool'.format(col, df[col].dtype))
+            elif isinstance(column.dtype, pd.CategoricalDtype) and df[col].dtype!=column.dtype:
+                problems.append('{} is {}, not {}'.format(col, df[col].dtype, column.dtype))
+
+        int_cols = [col for col, column in columns.items() if column.dtype==np.int32]
+        if int_cols:
+            numbers = np.nan_to_num(df[int_cols].to_numpy(dtype=np.float64))
+            problems.extend('{} has values that are not integers'.format(col)
+                            for col in np.asarray(int_cols)[(numbers!=np.round(numbers)).any(axis=0)])
+            # large counts are still loaded, but they are rounded in the float32 cache
+            large = np.asarray(int_cols)[(np.abs(numbers)>2**24).any(axis=0)]
+            if len(large)>0:
+                warnings.warn('{} has values that are not exact in float32, use load_project with use_cache=False and '
+                              'dtype=np.float64 for the exact values: {}'.format(name, ', '.join(large)))
+        if problems:
+            raise ValueError('{} does not match the schema: {}'.format(name, '; '.join(problems)))
+
+
+def _schema_columns():
+    """return the declared columns of the csv files, derived from the lists of features"""
+    columns = [SchemaColumn('commit', str, 'metadata'),
+               SchemaColumn('committer_date', pd.DatetimeTZDtype('ns', 'UTC'), 'metadata'),
+               SchemaColumn('file', str, 'metadata'),
+               SchemaColumn('oldest_name', str, 'metadata', nullable=True),
+               SchemaColumn('change_type', pd.CategoricalDtype(CHANGE_TYPES), 'metadata')]
+    groups = [('static_file', STATIC_FILE_FEATURES), ('static_class', STATIC_CLASS_FEATURES),
+              ('static_interface', STATIC_INTERFACE_FEATURES), ('static_enum', STATIC_ENUM_FEATURES),
+              ('static_method', STATIC_METHOD_FEATURES), ('fgjit', FGJIT_FEATURES), ('jit', JIT_FEATURES),
+              ('wd', WD_FEATURES), ('pmd', PMD_FEATURES)]
+    declared = set()
+    for group, features in groups:
+        for feature in features:
+            if feature in declared:
+                continue
+            declared.add(feature)
+            if feature in BOOLEAN_FEATURES:
+                dtype = np.dtype(bool)
+            elif group.startswith('static_') or feature in FLOAT_FEATURES:
+                dtype = np.dtype(np.float32)
+            else:
+                dtype = np.dtype(np.int32)
+            columns.append(SchemaColumn(feature, dtype, group))
+    return columns
+
+
+SCHEMA = Schema(_schema_columns(), {'induces__': SchemaColumn('induces__', np.dtype(bool), 'bugs')})
+
+
+if __name__ == '__main__':
+    # builds the missing or outdated caches, feature stores, and feature statistics of all projects, e.g., python utils.py ../data
+    # with --validate-float32, the scores of the float32 data are also compared to the float64 data of the csv
+    for project_name in list_all_projects(sys.argv[1]):
+        load_feature_store(sys.argv[1], project_name)
+        feature_statistics(sys.argv[1], project_name)
+        if '--validate-float32' in sys.argv[2:]:
+            print(project_name)
+            print(validate_float32(sys.argv[1], project_name))
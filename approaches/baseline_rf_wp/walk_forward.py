@@ -0,0 +1,111 @@
+"""Walk-forward (rolling-origin) evaluation of the baseline within project.
+
+Instead of the single split of approach.py, the test commits are processed in chronological batches, as if the
+model was used while the project evolves (see prepare_walk_forward_data in utils.py). At each step, the labels of
+the training data are derived again from the fix dates of the bugs, and the random forest is updated with
+warm_start, i.e., new trees are added for the new training data instead of fitting the whole forest again.
+Estimators that support partial_fit are only updated with the training rows that are new in a step.
+
+For each step, the runtime of the data preparation, the update of the model, and the prediction are reported
+together with the cumulative scores of all test batches so far. They are written to
+<scores>/walk_forward/<approach>_<project>.csv. Example:
+
+    python walk_forward.py ../../data ../../scores baseline_rf_wp 3 250 --step-commits 50
+"""
+import argparse
+import os
+import time
+from sklearn.ensemble import RandomForestClassifier
+
+from imblearn.over_sampling import SMOTE
+
+from utils import *
+
+RANDOM_SEED = 42
+
+
+def update_model(model, X_train, y_train, new_rows, trees_per_step):
+    """updates a fitted model with the training data of the next step instead of fitting it from scratch"""
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X_train[new_rows], y_train[new_rows], classes=[False, True])
+    else:
+        model.n_estimators += trees_per_step
+        model.fit(X_train, y_train)
+    return model
+
+
+def walk_forward(data_path, project_name, args):
+    """runs the walk-forward evaluation for a project and returns one row per step"""
+    data = load_project(path=data_path, project_name=project_name, columns=[])
+    steps = prepare_walk_forward_data(data, drop_months_end=args.drop_months_end, num_test_commits=args.num_test_commits,
+                                      step_commits=args.step_commits)
+
+    rf = None
+    train_rows = np.array([], dtype=np.int64)
+    test_dfs = []
+    predictions = []
+    results = []
+    while True:
+        start = time.perf_counter()
+        try:
+            train_df, test_df = next(steps)
+        except StopIteration:
+            break
+        X_train = load_features(data_path, train_df, features=ALL_FEATURES)
+        X_test = load_features(data_path, test_df, features=ALL_FEATURES)
+        y_train = train_df['is_inducing'].to_numpy()
+        prepare_time = time.perf_counter()-start
+
+        start = time.perf_counter()
+        np.random.seed(RANDOM_SEED)
+        X_res, y_res = SMOTE(random_state=RANDOM_SEED).fit_resample(X_train, y_train)
+        if rf is None:
+            rf = RandomForestClassifier(n_estimators=args.initial_trees, warm_start=True, random_state=RANDOM_SEED)
+            rf.fit(X_res, y_res)
+        else:
+            # SMOTE appends the synthetic rows, hence the positions of the new rows are the same in X_res
+            new_rows = np.flatnonzero(~np.isin(train_df.index.to_numpy(), train_rows))
+            new_rows = np.concatenate([new_rows, np.arange(len(X_train), len(X_res))])
+            update_model(rf, X_res, y_res, new_rows, args.trees_per_step)
+        train_rows = train_df.index.to_numpy()
+        update_time = time.perf_counter()-start
+
+        start = time.perf_counter()
+        y_pred = rf.predict(X_test)
+        predict_time = time.perf_counter()-start
+
+        test_dfs.append(test_df)
+        predictions.append(y_pred)
+        scores = score_model(combine_test_data(data, test_dfs), np.concatenate(predictions))
+        results.append(dict({'project': project_name, 'step': len(results), 'train_rows': len(train_df),
+                             'test_rows': len(test_df), 'trees': rf.n_estimators, 'prepare_time': prepare_time,
+                             'update_time': update_time, 'predict_time': predict_time}, **scores))
+        print('step {step}: {train_rows} training rows, {test_rows} test rows, {trees} trees, prepare {prepare_time:.2f}s, '
+              'update {update_time:.2f}s, predict {predict_time:.2f}s, cumulative mcc {mcc:.3f}, '
+              'cost_1000 {cost_1000:.0f}'.format(**results[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='walk-forward evaluation of the baseline within project')
+    parser.add_argument('data_path')
+    parser.add_argument('score_path')
+    parser.add_argument('approach_name')
+    parser.add_argument('drop_months_end', type=int)
+    parser.add_argument('num_test_commits', type=int)
+    parser.add_argument('--projects', nargs='+', default=None, help='projects, by default all projects in the data folder')
+    parser.add_argument('--step-commits', type=int, default=50, help='number of test commits per step')
+    parser.add_argument('--initial-trees', type=int, default=100, help='number of trees of the forest of the first step')
+    parser.add_argument('--trees-per-step', type=int, default=20, help='number of trees added to the forest in each later step')
+    args = parser.parse_args()
+
+    result_path = os.path.join(args.score_path, 'walk_forward')
+    os.makedirs(result_path, exist_ok=True)
+    for project_name in args.projects or list_all_projects(path=args.data_path):
+        print(project_name)
+        results = walk_forward(args.data_path, project_name, args)
+        pd.DataFrame(results).to_csv(os.path.join(result_path, '{}_{}.csv'.format(args.approach_name, project_name)), index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Benchmarks the data preparation and the scoring of the approaches.
+
+Each stage (e.g., load_project or prepare_all_data) is measured for each project in a fresh process, such that the
+measurements do not influence each other. The setup of a stage, e.g., loading the data for prepare_all_data, is not
+measured. For each stage and project, the wall time and cpu time (best and median of --repeat runs), the peak RSS of
+the process during the stage and its increase over the RSS before the stage (sampled by a background thread), and the
+peak of the memory allocated by python and numpy during the stage (tracemalloc) are reported. The memory is measured in
+extra runs, such that the sampling and tracing do not slow down the timed runs.
+
+The stages use the utils.py of an approach (default: baseline_rf_wp). The caches and feature stores are built
+before the measurements, hence load_project and prepare_* measure the cached data and splits. The uncached
+computations are measured as load_project_csv, within_project_split, and all_data_split, the latter two split data
+that is not marked as loaded from the cache, which is never cached.
+
+The results are written as json and can be compared with an earlier result, e.g., of the main branch. Stages that
+are more than --tolerance slower or use more memory are reported as regressions and the exit code is 1. Example:
+
+    python benchmark.py --output main.json
+    python benchmark.py --output branch.json --compare main.json
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+STAGES = ['load_project_csv', 'load_project', 'load_all_projects', 'within_project_split', 'prepare_within_project_data',
+          'all_data_split', 'prepare_all_data', 'score_model']
+
+# differences below these values are noise and never regressions
+MIN_DIFFERENCES = {'wall_best': 0.01, 'rss_increase_mb': 1.0, 'alloc_peak_mb': 1.0}
+
+# seconds between two samples of the RSS during a stage
+RSS_INTERVAL = 0.001
+
+# stages that use the data of all projects, they are measured once for each project as test project,
+# except for load_all_projects, which is measured once
+ALL_PROJECT_STAGES = ['load_all_projects', 'all_data_split', 'prepare_all_data']
+
+
+def setup_stage(utils, stage, data_path, project_name):
+    """prepares everything a stage needs and returns the function that runs the stage"""
+    if stage=='load_project_csv':
+        return lambda: utils.load_project(data_path, project_name, use_cache=False)
+    if stage=='load_project':
+        return lambda: utils.load_project(data_path, project_name)
+    if stage=='load_all_projects':
+        return lambda: utils.load_all_projects(data_path)
+
+    if stage in ALL_PROJECT_STAGES:
+        projects = utils.load_all_projects(data_path, columns=[])
+        if stage=='all_data_split':
+            projects = {name: uncached(df) for name, df in projects.items()}
+            return lambda: utils.all_data_split(project_name, projects)
+        return lambda: utils.prepare_all_data(project_name, projects)
+
+    data = utils.load_project(data_path, project_name, columns=[])
+    if stage=='within_project_split':
+        data = uncached(data)
+        return lambda: utils.within_project_split(data)
+    if stage=='prepare_within_project_data':
+        return lambda: utils.prepare_within_project_data(data)
+    if stage=='score_model':
+        _, test_df = utils.prepare_within_project_data(data)
+        y_pred = utils.np.random.RandomState(42).rand(len(test_df))<0.5
+        return lambda: utils.score_model(test_df, y_pred)
+    raise ValueError('unknown stage {}'.format(stage))
+
+
+def uncached(df):
+    """return a shallow copy of a data frame from load_project without the mark of the cache, such that its splits
+    are computed instead of read from the cache"""
+    df = df.copy(deep=False)
+    df.attrs = {key: value for key, value in df.attrs.items() if key!='cache'}
+    return df
+
+
+def rss_mb():
+    """return the current RSS of the process in MB"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/1024**2
+
+
+def rss_peak_mb(run):
+    """runs the function and returns the peak RSS in MB while it ran, sampled every RSS_INTERVAL seconds"""
+    peak = [rss_mb()]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_INTERVAL):
+            peak[0] = max(peak[0], rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        run()
+    finally:
+        done.set()
+        sampler.join()
+    return max(peak[0], rss_mb())
+
+
+def measure(approach_folder, stage, data_path, project_name, repeat, queue):
+    """measures a stage in the current process and puts the measurement into the queue"""
+    sys.path.insert(0, approach_folder)
+    utils = importlib.import_module('utils')
+    run = setup_stage(utils, stage, data_path, project_name)
+
+    wall = []
+    cpu = []
+    for _ in range(repeat):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        run()
+        wall.append(time.perf_counter()-start_wall)
+        cpu.append(time.process_time()-start_cpu)
+
+    rss_before = rss_mb()
+    rss_peak = rss_peak_mb(run)
+
+    tracemalloc.start()
+    run()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queue.put({'wall_best': min(wall), 'wall_median': sorted(wall)[len(wall)//2],
+               'cpu_best': min(cpu), 'cpu_median': sorted(cpu)[len(cpu)//2],
+               'rss_peak_mb': rss_peak, 'rss_increase_mb': max(0.0, rss_peak-rss_before),
+               'alloc_peak_mb': alloc_peak/1024**2})
+
+
+def run_stage(approach_folder, stage, data_path, project_name, repeat):
+    """measures a stage in a fresh process and returns the measurement"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(approach_folder, stage, data_path, project_name, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def environment():
+    """return the environment of the benchmark, such that results of different machines are not mixed up"""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit, 'python': platform.python_version(),
+            'machine': platform.machine(), 'node': platform.node(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline, tolerance):
+    """prints the ratios of the results to the baseline and returns the regressions"""
+    baseline = {(r['stage'], r['project']): r for r in baseline['results']}
+    regressions = []
+    print('{:<30} {:<15} {:>10} {:>10} {:>10}'.format('stage', 'project', 'wall', 'rss', 'alloc'))
+    for result in results:
+        base = baseline.get((result['stage'], result['project']))
+        if base is None:
+            continue
+        ratios = [result[metric]/base[metric] if base[metric]>0 else 1.0 for metric in MIN_DIFFERENCES]
+        print('{:<30} {:<15} {:>9.2f}x {:>9.2f}x {:>9.2f}x'.format(result['stage'], result['project'], *ratios))
+        if any(result[metric]-base[metric]>max(tolerance*base[metric], min_difference) for metric, min_difference in MIN_DIFFERENCES.items()):
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmarks the data preparation and the scoring')
+    parser.add_argument('--data', default='../data', help='folder with the data')
+    parser.add_argument('--approach', default='baseline_rf_wp', help='approach whose utils.py is benchmarked')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--projects', nargs='+', default=None, help='projects, by default all projects in the data folder')
+    parser.add_argument('--repeat', type=int, default=3, help='number of measured runs of each stage')
+    parser.add_argument('--output', default='benchmark.json', help='json file for the results')
+    parser.add_argument('--compare', default=None, help='json file with earlier results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative increase that is a regression')
+    args = parser.parse_args()
+
+    approach_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), args.approach)
+    data_path = os.path.abspath(args.data)
+    project_names = args.projects or sorted(file.split('.')[0] for file in os.listdir(data_path) if os.path.isfile(os.path.join(data_path, file)))
+
+    # build the caches and feature stores, and the cached splits, such that the measurements do not include them
+    subprocess.check_call([sys.executable, 'utils.py', data_path], cwd=approach_folder)
+    for stage in ['prepare_within_project_data', 'prepare_all_data']:
+        if stage in args.stages:
+            for project_name in project_names:
+                run_stage(approach_folder, stage, data_path, project_name, 1)
+
+    results = []
+    for stage in args.stages:
+        for project_name in (['all'] if stage=='load_all_projects' else project_names):
+            result = dict({'stage': stage, 'project': project_name}, **run_stage(approach_folder, stage, data_path, project_name, args.repeat))
+            print('{stage:<30} {project:<15} wall {wall_best:.3f}s cpu {cpu_best:.3f}s rss peak {rss_peak_mb:.0f}MB '
+                  '(+{rss_increase_mb:.0f}MB) alloc peak {alloc_peak_mb:.0f}MB'.format(**result), flush=True)
+            results.append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'approach': args.approach, 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('{} regressions: {}'.format(len(regressions), ', '.join('{stage} {project}'.format(**r) for r in regressions)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Runs all approaches on all projects in parallel.
+
+Each (approach, project) pair is a separate job that calls the approach.py of the approach with the project as
+optional sixth parameter. The jobs are executed as subprocesses, because every approach may use its own
+virtual environment (see setup_all.sh). Before the jobs start, the cache and the feature store of all projects
+are built once, such that all jobs share them instead of parsing the csv files.
+
+All jobs write their scores into the shared result store in the scores folder (see write_scores in utils.py),
+which serializes the writers and exports the latest scores of each project to <scores>/<approach>.csv. The
+store (<scores>/scores.sqlite) keeps the scores of all runs, delete it to clear them. All jobs of a call share one
+run id, hence a re-run with the same --run-id replaces the scores of that run instead of duplicating them. Jobs
+whose approach, data, and parameters did not change reuse their stored results (see run_key in utils.py), unless
+--rerun is set. Example:
+
+    python run_all.py --workers 8 --memory-gb 16
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+APPROACHES = ['baseline_rf_wp', 'baseline_rf_all', 'baseline_none', 'baseline_all']
+
+
+def python_executable(approach_folder):
+    """return the python of the virtual environment of an approach, if it exists"""
+    venv_python = os.path.join(approach_folder, 'venv', 'bin', 'python')
+    if os.path.exists(venv_python):
+        return venv_python
+    return sys.executable
+
+
+def list_projects(data_path):
+    """lists all projects from the data folder, same as list_all_projects in utils.py"""
+    return sorted(file.split('.')[0] for file in os.listdir(data_path) if os.path.isfile(os.path.join(data_path, file)))
+
+
+def available_cpus():
+    """return the number of cpus this process may use"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count()
+
+
+def memory_limit(memory_gb):
+    """return a function that limits the address space of a subprocess to memory_gb"""
+    def limit():
+        memory = int(memory_gb*1024**3)
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    return limit
+
+
+def log_file(score_path, approach_name, project_name):
+    """return the log file of a job"""
+    return os.path.join(score_path, 'logs', '{}_{}.txt'.format(approach_name, project_name))
+
+
+def run_job(approach_folder, approach_name, project_name, args):
+    """runs an approach for a single project and returns the return code and runtime"""
+    command = [python_executable(approach_folder), 'approach.py', os.path.abspath(args.data), os.path.abspath(args.scores),
+               approach_name, str(args.drop_months_end), str(args.num_test_commits), project_name]
+    env = dict(os.environ, PROMISE_RUN_ID=args.run_id)
+    if args.rerun:
+        env['PROMISE_RERUN'] = '1'
+    preexec_fn = memory_limit(args.memory_gb) if args.memory_gb else None
+    start = time.time()
+    with open(log_file(args.scores, approach_name, project_name), 'w') as log:
+        returncode = subprocess.call(command, cwd=approach_folder, stdout=log, stderr=subprocess.STDOUT, env=env, preexec_fn=preexec_fn)
+    return returncode, time.time()-start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='runs all approaches on all projects in parallel')
+    parser.add_argument('--data', default='../data', help='folder with the data')
+    parser.add_argument('--scores', default='../scores', help='folder for the scores')
+    parser.add_argument('--approaches', nargs='+', default=APPROACHES, help='approaches, i.e., subfolders with an approach.py')
+    parser.add_argument('--projects', nargs='+', default=None, help='projects, by default all projects in the data folder')
+    parser.add_argument('--drop-months-end', type=int, default=3)
+    parser.add_argument('--num-test-commits', type=int, default=250)
+    parser.add_argument('--workers', type=int, default=available_cpus(), help='number of jobs that run in parallel')
+    parser.add_argument('--memory-gb', type=float, default=None, help='memory limit (address space) per job in GB')
+    parser.add_argument('--run-id', default=uuid.uuid4().hex, help='id of the run in the result store, by default a new id')
+    parser.add_argument('--rerun', action='store_true', help='run all jobs again, even if their results could be reused')
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    project_names = args.projects or list_projects(args.data)
+    os.makedirs(os.path.join(args.scores, 'logs'), exist_ok=True)
+
+    # build the caches and feature stores once, all jobs share them afterwards
+    first_approach = os.path.join(here, args.approaches[0])
+    subprocess.check_call([python_executable(first_approach), 'utils.py', os.path.abspath(args.data)], cwd=first_approach)
+
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for approach_name in args.approaches:
+            for project_name in project_names:
+                future = executor.submit(run_job, os.path.join(here, approach_name), approach_name, project_name, args)
+                jobs[future] = (approach_name, project_name)
+        failed = 0
+        for future in as_completed(jobs):
+            approach_name, project_name = jobs[future]
+            returncode, runtime = future.result()
+            status = 'ok' if returncode==0 else 'failed ({}), see {}'.format(returncode, log_file(args.scores, approach_name, project_name))
+            print('{} {} {:.1f}s {}'.format(approach_name, project_name, runtime, status))
+            failed += returncode!=0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
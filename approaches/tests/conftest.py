@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'baseline_rf_wp'))
+
+
+def write_project(path, project_name, num_commits=120, files_per_commit=3, num_bugs=8, seed=0):
+    """writes a small synthetic project in the format of the csv files of the data"""
+    rng = np.random.RandomState(seed)
+    dates = pd.date_range('2018-01-01', periods=num_commits, freq='5D', tz='UTC')
+    rows = []
+    for i, date in enumerate(dates):
+        for j in range(files_per_commit):
+            rows.append({'commit': 'c{:04d}'.format(i),
+                         'committer_date': date.strftime('%Y-%m-%d %H:%M:%S+00:00'),
+                         'file': 'src/F{}.java'.format(j),
+                         'oldest_name': 'src/F{}.java'.format(j),
+                         'change_type': 'ModificationType.MODIFY',
+                         'la': int(rng.randint(1, 100)),
+                         'ld': int(rng.randint(0, 50)),
+                         'own': bool(rng.rand()<0.5)})
+    df = pd.DataFrame(rows)
+    for b in range(num_bugs):
+        fix_commit = int(rng.randint(num_commits//4, num_commits))
+        name = 'induces__{}-{}__f{:04d}__{}'.format(project_name.upper(), b, fix_commit, dates[fix_commit].strftime('%Y-%m-%d %H:%M:%S'))
+        inducing = rng.choice(fix_commit*files_per_commit, size=2, replace=False)
+        df[name] = 0
+        df.loc[inducing, name] = 1
+    df.to_csv(os.path.join(path, project_name+'.csv.gz'), index=False, compression='gzip')
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    """folder with two synthetic projects"""
+    write_project(str(tmp_path), 'alpha', seed=1)
+    write_project(str(tmp_path), 'beta', seed=2)
+    return str(tmp_path)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import utils
+
+
+def test_bug_matrix_follows_index(data_path):
+    df = utils.load_project(data_path, 'alpha', columns=[])
+    rows = [5, 1, 30]
+    matrix, _ = utils.bug_matrix(df.take(rows))
+    assert (matrix!=utils.bug_matrix(df)[0][rows]).nnz==0
+
+
+def test_reset_index_is_rejected(data_path):
+    df = utils.load_project(data_path, 'alpha', columns=[])
+    _, test_df = utils.prepare_within_project_data(df, num_test_commits=20)
+    predictions = np.arange(len(test_df))%2==0
+    utils.score_model(test_df, predictions)
+
+    with pytest.raises(ValueError):
+        utils.score_model(test_df.reset_index(drop=True), predictions)
+    with pytest.raises(ValueError):
+        utils.inducing(test_df.reset_index(drop=True))
+
+
+def test_prepare_all_data_keeps_bug_matrix(data_path):
+    projects = utils.load_all_projects(data_path, columns=[])
+    train_df, test_df = utils.prepare_all_data('alpha', projects, num_test_commits=20)
+    assert set(train_df['project'])=={'alpha', 'beta'}
+
+    # the labels follow from the combined bug matrix, which only contains bugs fixed before the test data
+    cutoff_date = test_df['committer_date'].min()
+    assert np.array_equal(utils.inducing(train_df), train_df['is_inducing'].to_numpy())
+    assert (utils.bug_matrix(train_df)[1]['fix_date']<=cutoff_date).all()
+
+    scores = train_df['is_inducing'].to_numpy(dtype=float)+np.linspace(0, 0.5, len(train_df))
+    threshold, costs = utils.cost_optimal_threshold(train_df, scores, 1000)
+    predictions = scores>=threshold
+    assert costs==utils.costs(train_df, predictions, 1000)
+
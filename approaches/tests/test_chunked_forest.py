@@ -0,0 +1,40 @@
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import utils
+
+APPROACH_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'baseline_rf_all')
+
+
+def load_approach():
+    sys.path.insert(0, APPROACH_PATH)
+    try:
+        spec = importlib.util.spec_from_file_location('baseline_rf_all_approach', os.path.join(APPROACH_PATH, 'approach.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(APPROACH_PATH)
+    return module
+
+
+def test_single_class_chunks_are_merged(data_path, monkeypatch):
+    approach = load_approach()
+    # the synthetic projects only have some of the features, hence we use them instead of the feature store
+    monkeypatch.setattr(approach, 'load_features', lambda path, df, features: df[features].to_numpy(dtype=np.float32))
+    df = utils.load_project(data_path, 'alpha', columns=['la', 'ld'])
+    labels = np.zeros(len(df), dtype=bool)
+    labels[150] = True
+    df['is_inducing'] = labels
+    # the first and the last chunk only have one class, the middle chunk has a single inducing row
+    chunks = [np.arange(0, 100), np.arange(100, 250), np.arange(250, len(df))]
+    rf = approach.fit_chunked_forest(data_path, df, ['la', 'ld'], chunks, RandomForestClassifier(), 10, 0)
+    assert rf.n_estimators==10
+
+    df['is_inducing'] = False
+    with pytest.raises(ValueError):
+        approach.fit_chunked_forest(data_path, df, ['la', 'ld'], chunks, RandomForestClassifier(), 10, 0)
@@ -0,0 +1,66 @@
+import gzip
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+
+
+def test_last_line_without_line_break(data_path):
+    file_name = os.path.join(data_path, 'alpha.csv.gz')
+    with gzip.open(file_name, 'rb') as f:
+        content = f.read()
+    with gzip.open(file_name, 'wb') as f:
+        f.write(content.rstrip(b'\n'))
+
+    assert utils._count_rows(file_name)==content.count(b'\n')-1
+    df = utils.load_project(data_path, 'alpha')
+    assert 'cache' in df.attrs
+    assert df.equals(utils.load_project(data_path, 'alpha', use_cache=False))
+
+
+def test_checksum_follows_changes(tmp_path):
+    file_name = os.path.join(str(tmp_path), 'file.csv')
+    with open(file_name, 'w') as f:
+        f.write('a\n1\n')
+    checksum = utils._file_checksum(file_name)
+    assert utils._file_checksum(file_name)==checksum
+
+    # the same size, but a later modification time
+    with open(file_name, 'w') as f:
+        f.write('a\n2\n')
+    os.utime(file_name, ns=(os.stat(file_name).st_atime_ns, os.stat(file_name).st_mtime_ns+10**9))
+    assert utils._file_checksum(file_name)!=checksum
+
+
+def test_failed_rebuild_does_not_load_old_cache(data_path, monkeypatch):
+    assert len(utils.load_project(data_path, 'alpha'))==360
+    file_name = os.path.join(data_path, 'alpha.csv.gz')
+    with gzip.open(file_name, 'rb') as f:
+        lines = f.read().split(b'\n')
+    with gzip.open(file_name, 'wb') as f:
+        f.write(b'\n'.join(lines[:181])+b'\n')
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(utils.np, 'save', fail)
+    with pytest.warns(UserWarning, match='could not write cache'):
+        df = utils.load_project(data_path, 'alpha')
+    assert len(df)==180 and 'cache' not in df.attrs
+
+
+def test_undeclared_columns_and_large_counts_are_loaded(data_path):
+    file_name = os.path.join(data_path, 'alpha.csv.gz')
+    df = pd.read_csv(file_name)
+    df['current_HCPL_file'] = 'unknown'
+    df.loc[0, 'la'] = 2**31+1
+    df.to_csv(file_name, index=False, compression='gzip')
+
+    with pytest.warns(UserWarning, match='not part of the schema'):
+        loaded = utils.load_project(data_path, 'alpha', use_cache=False, dtype=np.float64)
+    assert 'current_HCPL_file' not in loaded.columns and loaded.loc[0, 'la']==2**31+1
+    with pytest.warns(UserWarning, match='not exact in float32'):
+        loaded = utils.load_project(data_path, 'alpha')
+    assert 'cache' in loaded.attrs and len(loaded)==len(df)
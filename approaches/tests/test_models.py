@@ -0,0 +1,37 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+import utils
+
+
+def test_model_not_reused_for_other_estimator(data_path, tmp_path):
+    df = utils.load_project(data_path, 'alpha', columns=['la', 'ld'])
+    X = df[['la', 'ld']].to_numpy()
+    df['is_inducing'] = y = np.arange(len(df))%2
+    estimator = RandomForestClassifier(n_estimators=5, random_state=0)
+    info = utils.model_info(df, X, ['la', 'ld'], estimator=estimator, approach_file=utils.__file__)
+    utils.store_model(str(tmp_path), 'model', estimator.fit(X, y), info)
+
+    rf, up_to_date = utils.load_model(str(tmp_path), 'model', info)
+    assert up_to_date and rf.n_estimators==5
+
+    # a different configuration of the estimator must not load the stored forest
+    other = utils.model_info(df, X, ['la', 'ld'], estimator=RandomForestClassifier(n_estimators=3, max_depth=2),
+                             approach_file=utils.__file__)
+    assert utils.load_model(str(tmp_path), 'model', other)==(None, False)
+
+
+def test_outdated_model_only_returned_for_update(data_path, tmp_path):
+    df = utils.load_project(data_path, 'alpha', columns=['la', 'ld'])
+    X = df[['la', 'ld']].to_numpy()
+    df['is_inducing'] = y = np.arange(len(df))%2
+    estimator = RandomForestClassifier(n_estimators=5, random_state=0)
+    train = np.arange(len(df)//2)
+    info = utils.model_info(df.iloc[train], X[train], ['la', 'ld'], estimator=estimator)
+    utils.store_model(str(tmp_path), 'model', estimator.fit(X[train], y[train]), info)
+
+    # new training commits only lead to an update of the stored forest if it is asked for
+    new_info = utils.model_info(df, X, ['la', 'ld'], estimator=RandomForestClassifier(n_estimators=5, random_state=0))
+    assert utils.load_model(str(tmp_path), 'model', new_info)==(None, False)
+    rf, up_to_date = utils.load_model(str(tmp_path), 'model', new_info, update=True)
+    assert rf is not None and not up_to_date
@@ -0,0 +1,35 @@
+import csv
+import os
+
+import numpy as np
+
+import utils
+
+
+def read_scores(file_name):
+    with open(file_name) as f:
+        return [(row['project'], row['mcc']) for row in csv.DictReader(f)]
+
+
+def test_export_latest_scores_of_each_project(tmp_path):
+    path = str(tmp_path)
+    file_name = os.path.join(path, 'approach.csv')
+    utils.write_scores(path, 'approach', 'alpha', {'mcc': 0.1}, run_id='first')
+    utils.write_scores(path, 'approach', 'beta', {'mcc': 0.2}, run_id='first')
+    utils.write_scores(path, 'approach', 'alpha', {'mcc': 0.3}, run_id='first')
+    assert read_scores(file_name)==[('beta', '0.2'), ('alpha', '0.3')]
+
+    # projects that run one at a time, i.e., with different run ids, are all exported with their latest scores
+    utils.write_scores(path, 'approach', 'beta', {'mcc': 0.4}, run_id='second')
+    utils.write_scores(path, 'approach', 'gamma', {'mcc': 0.5}, run_id='third')
+    assert read_scores(file_name)==[('alpha', '0.3'), ('beta', '0.4'), ('gamma', '0.5')]
+
+
+def test_costs_are_written_as_integers(data_path, tmp_path):
+    df = utils.load_project(data_path, 'alpha', columns=[])
+    _, test_df = utils.prepare_within_project_data(df, num_test_commits=20)
+    scores = utils.score_model(test_df, np.arange(len(test_df))%2==0)
+    utils.write_scores(str(tmp_path), 'approach', 'alpha', scores, run_id='first')
+    with open(os.path.join(str(tmp_path), 'approach.csv')) as f:
+        row = next(csv.DictReader(f))
+    assert row['cost_1000']==str(int(row['cost_1000'])) and row['cost_10000']==str(int(row['cost_10000']))
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from sklearn.metrics import matthews_corrcoef
+
+import utils
+
+
+# the dense reference implementation, i.e., the functions of the original utils.py on the induces__ columns
+
+def dense_project(data_path, project_name):
+    df = pd.read_csv(os.path.join(data_path, project_name+'.csv.gz'))
+    df['committer_date'] = pd.to_datetime(df['committer_date'])
+    return df
+
+
+def dense_bug_columns(df):
+    return [col for col in df.columns if col.startswith('induces__')]
+
+
+def dense_prepare_within_project_data(test_project_df, drop_months_end=3, num_test_commits=250):
+    cutoff_end = test_project_df['committer_date'].max()-relativedelta(months=drop_months_end)
+    test_project_df = test_project_df[test_project_df['committer_date']<cutoff_end]
+    lc = test_project_df['commit'].unique()[-num_test_commits:]
+    test_df = test_project_df[test_project_df['commit'].isin(lc)].copy()
+    train_df = test_project_df[~test_project_df['commit'].isin(lc)].copy()
+    test_start_date = test_df['committer_date'].min()
+    late_bugs = [col for col in dense_bug_columns(train_df) if pd.to_datetime(col.split('__')[3], utc=True)>test_start_date]
+    train_df.drop(columns=late_bugs, inplace=True)
+    train_df = train_df[train_df['committer_date']<test_start_date-relativedelta(months=3)]
+    train_df['is_inducing'] = train_df[dense_bug_columns(train_df)].any(axis=1)
+    test_df['is_inducing'] = test_df[dense_bug_columns(test_df)].any(axis=1)
+    return train_df, test_df
+
+
+def dense_scores(test_df, predictions):
+    bug_matrix = test_df[dense_bug_columns(test_df)]
+    efforts = test_df['la']+test_df['ld']
+    effort_true = efforts[predictions].sum()
+    effort_false = efforts[~predictions].sum()
+    bugs_found = bug_matrix.sum().eq(bug_matrix[predictions].sum()).sum()
+    bugs_missed = len(bug_matrix.columns)-bugs_found
+    return {'mcc': matthews_corrcoef(test_df['is_inducing'], predictions),
+            'c_lower': effort_true/bugs_found,
+            'c_upper': effort_false/bugs_missed,
+            'cost_1000': effort_true+1000*bugs_missed,
+            'cost_10000': effort_true+10000*bugs_missed}
+
+
+def test_scores_match_dense_reference(data_path):
+    df = utils.load_project(data_path, 'alpha', columns=[])
+    train_df, test_df = utils.prepare_within_project_data(df, num_test_commits=20)
+    dense_train, dense_test = dense_prepare_within_project_data(dense_project(data_path, 'alpha'), num_test_commits=20)
+    assert np.array_equal(train_df.index, dense_train.index) and np.array_equal(test_df.index, dense_test.index)
+    assert np.array_equal(train_df['is_inducing'], dense_train['is_inducing'])
+    assert np.array_equal(test_df['is_inducing'], dense_test['is_inducing'])
+
+    rng = np.random.RandomState(0)
+    predictions = np.array([rng.rand(len(test_df))<p for p in [0.2, 0.5, 0.8]])
+    batch = utils.score_models(test_df, predictions)
+    for i, y_pred in enumerate(predictions):
+        scores = utils.score_model(test_df, y_pred)
+        reference = dense_scores(dense_test, y_pred)
+        assert list(scores)==list(reference)
+        assert np.allclose(list(scores.values()), list(reference.values()), rtol=1e-12)
+        assert np.allclose(batch.iloc[i].to_numpy(dtype=float), list(scores.values()), rtol=1e-12)
+        assert utils.costs(test_df, y_pred, 1000)==reference['cost_1000']
+        assert np.isclose(utils.lower_bound(test_df, y_pred), reference['c_lower'])
+        assert np.isclose(utils.upper_bound(test_df, y_pred), reference['c_upper'])
+
+
+def test_inducing_at_many_cutoff_dates(data_path):
+    df = utils.load_project(data_path, 'alpha', columns=[])
+    dense = dense_project(data_path, 'alpha')
+    cutoff_dates = df['committer_date'].quantile([0.25, 0.5, 0.75, 1.0]).tolist()
+    labels = utils.inducing(df, cutoff_dates)
+    assert labels.shape==(len(df), len(cutoff_dates))
+    for i, cutoff_date in enumerate(cutoff_dates):
+        known = [col for col in dense_bug_columns(dense) if pd.to_datetime(col.split('__')[3], utc=True)<=cutoff_date]
+        assert np.array_equal(labels[:, i], dense[known].any(axis=1).to_numpy())
+        assert np.array_equal(labels[:, i], utils.inducing(df, cutoff_date))
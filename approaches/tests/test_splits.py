@@ -0,0 +1,14 @@
+import numpy as np
+
+import utils
+
+
+def test_cached_split_depends_on_version(data_path, monkeypatch):
+    df = utils.load_project(data_path, 'alpha', columns=[])
+    split = utils.within_project_split(df, num_test_commits=20)
+    assert np.array_equal(utils.within_project_split(df, num_test_commits=20)['train'], split['train'])
+
+    # a new version of the split functions must not reuse the cached split
+    monkeypatch.setattr(utils, 'SPLIT_VERSION', utils.SPLIT_VERSION+1)
+    monkeypatch.setattr(utils, '_within_project_split', lambda *args: {'train': np.array([0]), 'test': np.array([1])})
+    assert np.array_equal(utils.within_project_split(df, num_test_commits=20)['train'], [0])
@@ -0,0 +1,14 @@
+import filecmp
+import os
+
+APPROACHES_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_utils_are_identical():
+    # every approach folder has its own copy of utils.py, such that it runs on its own (see requirements.md)
+    folders = sorted(folder for folder in os.listdir(APPROACHES_PATH)
+                     if os.path.isfile(os.path.join(APPROACHES_PATH, folder, 'utils.py')))
+    assert len(folders)>1
+    reference = os.path.join(APPROACHES_PATH, 'baseline_rf_wp', 'utils.py')
+    for folder in folders:
+        assert filecmp.cmp(reference, os.path.join(APPROACHES_PATH, folder, 'utils.py'), shallow=False), folder